@@ -11,14 +11,22 @@ warnings.filterwarnings(
     message="pkg_resources is deprecated"
 )
 
-from fastapi import FastAPI
+import asyncio
+from contextlib import asynccontextmanager
+from fastapi    import FastAPI
 
-from services.infrastructure.cache.upstash      import UpStash
-from services.infrastructure.cloud.azure        import Azure
-from services.infrastructure.db.supabase        import Supabase
-from services.infrastructure.llm.llm_groq       import LLMGroq
-from services.infrastructure.storage.r2_storage import R2Storage
-from services.infrastructure.vector.zilliz      import Zilliz
+from services.infrastructure.cache.mix_snapshot    import MixSnapshot
+from services.infrastructure.cache.rate_limiter    import RateLimiter
+from services.infrastructure.cache.signature_cache import SignatureCache
+from services.infrastructure.cache.upstash         import UpStash
+from services.infrastructure.cloud.azure           import Azure
+from services.infrastructure.crypto.signer         import Signer
+from services.infrastructure.db.supabase           import Supabase
+from services.infrastructure.llm.llm_groq          import LLMGroq
+from services.infrastructure.storage.r2_storage    import AsyncR2Storage
+from services.infrastructure.vector.zilliz         import Zilliz
+
+from services.domain.standard.signature            import key_ring
 
 from middlewares import register_middlewares
 from routers     import register_routers
@@ -26,18 +34,41 @@ from routers     import register_routers
 from utils import (
     const, toolset
 )
+from utils.ttl_cache import TTLCache
+
+
+@asynccontextmanager
+async def lifespan(application: FastAPI):
+    await asyncio.to_thread(key_ring.preload)
+    await application.state.signer.start()
+    await application.state.snapshot.start()
+    await application.state.limiter.start()
+    yield
+    await application.state.signer.stop()
+    await application.state.r2.stop()
+    await application.state.limiter.stop()
+    await application.state.snapshot.stop()
+    await application.state.supabase.stop()
 
 
-app = FastAPI(**const.SETTINGS)
+app = FastAPI(**const.SETTINGS, lifespan=lifespan)
 
 toolset.init_logger()
 
 app.state.cache    = UpStash()
 app.state.azure    = Azure()
-app.state.supabase = Supabase()
+app.state.supabase = Supabase(app.state.cache)
 app.state.llm_groq = LLMGroq()
-app.state.r2       = R2Storage()
+app.state.r2       = AsyncR2Storage()
 app.state.store    = Zilliz()
+app.state.snapshot = MixSnapshot(app.state.cache)
+app.state.limiter  = RateLimiter(app.state.cache)
+
+app.state.signatures = SignatureCache(app.state.cache)
+app.state.signer     = Signer(key_ring)
+
+app.state.token_cache  = TTLCache(maxsize=const.TOKEN_CACHE_SIZE, ttl=const.TOKEN_NEGATIVE_TTL)
+app.state.token_denied = TTLCache(maxsize=const.TOKEN_NEGATIVE_SIZE, ttl=const.TOKEN_NEGATIVE_TTL)
 
 register_middlewares(app)
 register_routers(app)
@@ -7,21 +7,12 @@
 
 from fastapi import FastAPI
 
-from .mid_access     import access_middleware
-from .mid_auth       import jwt_auth_middleware
-from .mid_exception  import exception_middleware
-from .mid_rate_limit import rate_limit_middleware
+from .mid_pipeline import PipelineMiddleware
 
 
 def register_middlewares(app: FastAPI) -> None:
-    # inbound 1（最外层）
-    app.middleware("http")(rate_limit_middleware   )
-    # inbound 2
-    app.middleware("http")(jwt_auth_middleware     )
-    # inbound 3
-    app.middleware("http")(access_middleware       )
-    # inbound 4（最内层）
-    app.middleware("http")(exception_middleware    )
+    # 单层纯 ASGI 管线：Trace → 鉴权 → 限流 → 业务 → 异常映射 / 计时
+    app.add_middleware(PipelineMiddleware)
 
 
 if __name__ == '__main__':
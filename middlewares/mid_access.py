@@ -5,57 +5,38 @@
 # /_/   \_\___\___\___||___/___/ |_|  |_|_|\__,_|\__,_|_|\___| \_/\_/ \__,_|_|  \___|
 #
 
-import time
-import uuid
-import typing
 from loguru import logger
 from fastapi import Request
 
 
-async def access_middleware(
-    request: Request,
-    call_next: typing.Callable
-) -> typing.Any:
-    """
-    访问日志中间件 (Access Middleware):
-    - Trace-ID
-    - 客户端 IP
-    - 性能监控（精确）
-    - 慢请求告警
-    - Incoming / Outgoing 日志
-    """
-
-    # ---- Trace ID ----
-    trace_id = str(uuid.uuid4())
-    request.state.trace_id = trace_id
+def client_ip(request: Request) -> str:
+    """客户端真实 IP"""
 
-    # ---- 客户端真实 IP ----
-    client_ip = (
+    return (
         request.headers.get("CF-Connecting-IP") or
         request.headers.get("X-Real-IP") or
         request.headers.get("X-Forwarded-For") or
         (request.client.host if request.client else "unknown")
     )
 
-    method = request.method
-    path   = request.url.path
 
-    # ---- 请求日志 ----
+def access_incoming(request: Request, trace_id: str) -> None:
+    """Incoming 日志"""
+
     logger.info(
-        f"[{trace_id}] → Incoming {method} {path} (from={client_ip})"
+        f"[{trace_id}] → Incoming {request.method} {request.url.path} (from={client_ip(request)})"
     )
 
-    # ---- 性能计时 ----
-    start = time.perf_counter()
 
-    response = await call_next(request)
+def access_outgoing(request: Request, trace_id: str, status_code: int, cost_ms: float) -> None:
+    """
+    Outgoing 日志与慢请求告警。
 
-    # ---- 耗时计算 ----
-    cost_ms = round((time.perf_counter() - start) * 1000, 2)
+    cost_ms 覆盖完整响应体（含流式响应），而非仅到响应头为止。
+    """
 
-    # ---- 响应头 ----
-    response.headers["X-Trace-ID"] = trace_id
-    response.headers["X-Process-Time"] = str(cost_ms)
+    method = request.method
+    path   = request.url.path
 
     # ---- 慢请求警告 ----
     if cost_ms > 300:
@@ -65,11 +46,9 @@ async def access_middleware(
 
     # ---- 响应日志 ----
     logger.info(
-        f"[{trace_id}] ← Outgoing {response.status_code} {path} ({cost_ms}ms)"
+        f"[{trace_id}] ← Outgoing {status_code} {path} ({cost_ms}ms)"
     )
 
-    return response
-
 
 if __name__ == '__main__':
     pass
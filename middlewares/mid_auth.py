@@ -5,32 +5,30 @@
 # /_/   \_\__,_|\__|_| |_| |_|  |_|_|\__,_|\__,_|_|\___| \_/\_/ \__,_|_|  \___|
 #
 
-import typing
 from loguru import logger
 from fastapi import Request
-from schemas.cognitive import Mix
 from schemas.errors import AuthorizationError
 from services.domain.standard import signature
-from services.infrastructure.cache.upstash import UpStash
-from utils import const
+from services.infrastructure.cache.mix_snapshot import MixSnapshot
+from utils.ttl_cache import TTLCache
 
 
 async def jwt_auth_middleware(
-    request: Request,
-    call_next: typing.Callable
-) -> typing.Any:
-    """鉴权中间件"""
+    request: Request
+) -> None:
+    """鉴权中间件：白名单放行，否则校验 X-App-ID / X-App-Token，失败抛出 AuthorizationError"""
 
-    cache: UpStash = request.app.state.cache
+    snapshot: MixSnapshot  = request.app.state.snapshot
+    token_cache: TTLCache  = request.app.state.token_cache
+    token_denied: TTLCache = request.app.state.token_denied
 
-    if mixed := await cache.get(const.K_MIX): mix = Mix(**mixed)
-    else: mix = Mix(**const.V_MIX)
+    mix = snapshot.bind(request)
 
     public_paths = mix.white_list
     logger.info(f"远程鉴权白名单 -> {public_paths}")
 
     if request.url.path in public_paths:
-        return await call_next(request)
+        return None
 
     x_app_id      = request.headers.get("X-App-ID")
     x_app_token   = request.headers.get("X-App-Token")
@@ -46,7 +44,7 @@ async def jwt_auth_middleware(
         )
 
     try:
-        signature.verify_jwt(x_app_id, x_app_token)
+        signature.verify_jwt_cached(token_cache, token_denied, x_app_id, x_app_token)
     except Exception as e:
         logger.error(
             f"❗ Token verification failed, Reason={e}"
@@ -60,8 +58,6 @@ async def jwt_auth_middleware(
     request.state.x_app_region  = x_app_region
     request.state.x_app_version = x_app_version
 
-    return await call_next(request)
-
 
 if __name__ == '__main__':
     pass
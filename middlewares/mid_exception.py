@@ -6,8 +6,6 @@
 #                    |_|
 #
 
-import uuid
-import typing
 from loguru import logger
 from fastapi import (
     Request, HTTPException
@@ -19,17 +17,15 @@ from schemas.errors import (
 )
 
 
-async def exception_middleware(
+def exception_middleware(
     request: Request,
-    call_next: typing.Callable
-) -> typing.Any:
-    """全局异常中间件"""
-
-    trace_id = getattr(request.state, "trace_id", str(uuid.uuid4()))
-    request.state.trace_id = trace_id
+    trace_id: str,
+    exc: Exception
+) -> JSONResponse:
+    """全局异常中间件：将异常映射为统一 JSON 错误响应"""
 
     try:
-        return await call_next(request)
+        raise exc
 
     except (AuthorizationError, BizError) as e:
         logger.error(
@@ -42,7 +38,8 @@ async def exception_middleware(
                 "type"     : e.__class__.__name__,
                 "trace_id" : trace_id
             },
-            status_code=e.status_code
+            status_code=e.status_code,
+            headers=e.headers
         )
 
     except HTTPException as e:
@@ -56,7 +53,8 @@ async def exception_middleware(
                 "type"     : e.__class__.__name__,
                 "trace_id" : trace_id
             },
-            status_code=e.status_code
+            status_code=e.status_code,
+            headers=e.headers
         )
 
     except RequestValidationError as e:
@@ -0,0 +1,98 @@
+#  ____  _            _ _              __  __ _     _     _ _
+# |  _ \(_)_ __   ___| (_)_ __   ___  |  \/  (_) __| | __| | | _____      ____ _ _ __ ___
+# | |_) | | '_ \ / _ \ | | '_ \ / _ \ | |\/| | |/ _` |/ _` | |/ _ \ \ /\ / / _` | '__/ _ \
+# |  __/| | |_) |  __/ | | | | |  __/ | |  | | | (_| | (_| | |  __/\ V  V / (_| | | |  __/
+# |_|   |_| .__/ \___|_|_|_| |_|\___| |_|  |_|_|\__,_|\__,_|_|\___| \_/\_/ \__,_|_|  \___|
+#         |_|
+#
+
+import time
+import uuid
+from loguru import logger
+from fastapi import Request
+from starlette.datastructures import MutableHeaders
+from starlette.types import (
+    ASGIApp, Message, Receive, Scope, Send
+)
+
+from .mid_access     import access_incoming, access_outgoing
+from .mid_auth       import jwt_auth_middleware
+from .mid_exception  import exception_middleware
+from .mid_rate_limit import rate_limit_middleware
+
+
+class PipelineMiddleware(object):
+    """
+    纯 ASGI 请求管线，单次遍历完成：
+
+    1) Trace-ID + Incoming 日志
+    2) 鉴权（jwt_auth_middleware）
+    3) 限流（rate_limit_middleware）
+    4) 异常映射（exception_middleware）
+    5) 计时 + Outgoing 日志，计时覆盖完整响应体（含 StreamingResponse）
+
+    响应头 `X-Process-Time` 在发送响应头时写入，为首字节耗时；
+    Outgoing 日志在最后一个 body 分片发送后记录，为完整耗时。
+    """
+
+    def __init__(self, app: ASGIApp):
+        self.app = app
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if scope["type"] != "http":
+            return await self.app(scope, receive, send)
+
+        request  = Request(scope)
+        trace_id = str(uuid.uuid4())
+        request.state.trace_id = trace_id
+
+        access_incoming(request, trace_id)
+
+        start    = time.perf_counter()
+        extra    = {}
+        status   = 500
+        started  = False
+        finished = False
+
+        def cost() -> float:
+            return round((time.perf_counter() - start) * 1000, 2)
+
+        def finish() -> None:
+            nonlocal finished
+            if not finished:
+                finished = True
+                access_outgoing(request, trace_id, status, cost())
+
+        async def send_wrapper(message: Message) -> None:
+            nonlocal status, started
+            if message["type"] == "http.response.start":
+                status, started = message["status"], True
+                headers = MutableHeaders(scope=message)
+                for key, value in extra.items():
+                    headers[key] = value
+                headers["X-Trace-ID"] = trace_id
+                headers["X-Process-Time"] = str(cost())
+
+            await send(message)
+
+            if message["type"] == "http.response.body" and not message.get("more_body", False):
+                finish()
+
+        try:
+            await jwt_auth_middleware(request)
+            extra.update(await rate_limit_middleware(request))
+            await self.app(scope, receive, send_wrapper)
+
+        except Exception as e:
+            if started:
+                logger.error(f"[{trace_id}] ❌ Exception after response started: {e}")
+                raise
+            response = exception_middleware(request, trace_id, e)
+            await response(scope, receive, send_wrapper)
+
+        finally:
+            finish()
+
+
+if __name__ == '__main__':
+    pass
@@ -5,72 +5,58 @@
 # |_| \_\__,_|\__\___| |_____|_|_| |_| |_|_|\__| |_|  |_|_|\__,_|\__,_|_|\___| \_/\_/ \__,_|_|  \___|
 #
 
-import time
-import typing
-import asyncio
+import math
 from loguru import logger
 from fastapi import (
     Request, HTTPException
 )
-from schemas.cognitive import Mix
-from services.infrastructure.cache.upstash import UpStash
-from utils import const
+from services.infrastructure.cache.mix_snapshot import MixSnapshot
+from services.infrastructure.cache.rate_limiter import RateLimiter
 
 
 async def rate_limit_middleware(
-    request: Request,
-    call_next: typing.Callable
-) -> typing.Any:
-    """限流中间件"""
+    request: Request
+) -> dict[str, str]:
+    """限流中间件：放行时返回需附加的响应头，超限抛出 429 HTTPException"""
 
-    cache: UpStash = request.app.state.cache
+    limiter: RateLimiter  = request.app.state.limiter
+    snapshot: MixSnapshot = request.app.state.snapshot
 
-    if mixed := await cache.get(const.K_MIX): mix = Mix(**mixed)
-    else: mix = Mix(**const.V_MIX)
+    mix = snapshot.bind(request)
 
     config = mix.rate_config
     logger.info(f"远程限流配置表 -> {config}")
 
     route = request.url.path
     ip    = request.client.host
-    key   = f"tb:{hash(route)}:{ip}"
 
-    default_config = config.get("default", {})
-    route_config   = config.get("routes", {}).get(route, {})
-    ip_config      = config.get("ip", {}).get(ip, {})
-
-    final = {**default_config, **route_config, **ip_config}
-    logger.info(f"RateRule={final}")
-
-    burst    = final.get("burst",   10)
-    rate     = final.get("rate",     2)
-    max_wait = final.get("max_wait", 1)
-
-    while True:
-        now    = int(time.time() * 1000)
-        tokens = await cache.client.eval(
-            const.TOKEN_BUCKET_LUA, 1, key, burst, rate, now
+    rule = limiter.rules(snapshot.version, config).lookup(route, ip)
+    logger.info(f"RateRule={rule.config}")
+
+    # 只信任鉴权中间件写入的身份；白名单路径未经鉴权，请求头可随意轮换，按 IP 限流
+    ident = ip
+    if rule.key_by == "app" and (x_app_id := getattr(request.state, "x_app_id", None)):
+        ident = f"app:{x_app_id}"
+
+    tokens, retry = await limiter.acquire(limiter.key(route, ident), rule)
+
+    if tokens < 0:
+        raise HTTPException(
+            status_code=429,
+            detail={
+                "error" : "RATE_LIMIT_HIT",
+                "rule"  : rule.config,
+                "retry" : round(retry, 3)
+            },
+            headers={
+                "Retry-After": str(math.ceil(retry))
+            }
         )
 
-        if tokens >= 0:
-            resp = await call_next(request)
-            resp.headers["X-Rate-Limit"] = f"{burst} burst / {rate}/s"
-            resp.headers["X-Rate-Remaining"] = str(round(tokens, 2))
-            return resp
-
-        if (wait := 1 / rate) > max_wait:
-            raise HTTPException(
-                status_code=429,
-                detail={
-                    "error" : "RATE_LIMIT_HIT",
-                    "rule"  : final,
-                    "retry" : wait
-                },
-                headers={
-                    "Retry-After": str(round(wait))
-                }
-            )
-        await asyncio.sleep(wait)
+    return {
+        "X-Rate-Limit"     : f"{rule.burst} burst / {rule.rate}/s",
+        "X-Rate-Remaining" : str(round(tokens, 2))
+    }
 
 
 if __name__ == '__main__':
@@ -34,7 +34,7 @@ async def api_sign(
     """
     logger.info(f"signature request: {req}")
 
-    return signature.manage_signature(req, request)
+    return await signature.manage_signature(req, request)
 
 
 if __name__ == '__main__':
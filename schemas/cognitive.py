@@ -53,10 +53,16 @@ class LicenseResponse(BaseModel):
         Base64编码后的授权载荷(JSON)，需要客户端解码以获取完整内容。
     signature : str
         Base64编码的签名，用于验证license完整性与合法来源。
+    links : dict, optional
+        不参与签名的下载链接，仅在请求头 `X-License-Links: detached` 时返回。
+    alg : str, optional
+        签名算法（`ed25519` / `es256`），RSA 默认签名时不返回。
     """
 
     data: str = Field(..., description="Base64编码后的 License 数据载荷(JSON encoded)")
     signature: str = Field(..., description="Base64编码的数字签名，用于校验授权合法性")
+    links: typing.Optional[dict[str, str]] = Field(None, description="不参与签名的下载链接(detached 模式)")
+    alg: typing.Optional[str] = Field(None, description="签名算法，缺省为 RSA PKCS1v15 SHA-256")
 
     model_config = ConfigDict(from_attributes=True)
 
@@ -13,12 +13,13 @@ import asyncio
 from loguru import logger
 from fastapi import Request
 from schemas.cognitive import (
-    HealRequest, HealResponse, Mix
+    HealRequest, HealResponse
 )
 from services.domain.standard import signature
 from services.domain.self_heal.parsing import (
     AndroidXmlParser, WebDomParser
 )
+from services.infrastructure.cache.mix_snapshot import MixSnapshot
 from services.infrastructure.cache.upstash import UpStash
 from services.infrastructure.llm.llm_groq import LLMGroq
 from services.infrastructure.vector.zilliz import Zilliz
@@ -31,9 +32,10 @@ class Decision(object):
         self.req: HealRequest = req
         self.request: Request = request
 
-        self.cache: UpStash    = request.app.state.cache
-        self.store: Zilliz     = request.app.state.store
-        self.llm_groq: LLMGroq = request.app.state.llm_groq
+        self.cache: UpStash        = request.app.state.cache
+        self.snapshot: MixSnapshot = request.app.state.snapshot
+        self.store: Zilliz         = request.app.state.store
+        self.llm_groq: LLMGroq     = request.app.state.llm_groq
 
         self.k     = 5
         self.top_k = 3
@@ -41,8 +43,7 @@ class Decision(object):
         self.alpha = 1 - self.beta
 
     async def delivery(self, url: str, json: dict, **kwargs) -> dict:
-        if mixed := await self.cache.get(const.K_MIX): mix = Mix(**mixed)
-        else: mix = Mix(**const.V_MIX)
+        mix = self.snapshot.bind(self.request)
 
         cur = mix.app.get("Modal", {}).get("DNS", const.DNS)
         logger.info(f"远程域名服务地址 -> {cur}")
@@ -56,8 +57,7 @@ class Decision(object):
             return resp.json()
 
     async def load_model_from_cache(self) -> None:
-        if mixed := await self.cache.get(const.K_MIX): mix = Mix(**mixed)
-        else: mix = Mix(**const.V_MIX)
+        mix = self.snapshot.bind(self.request)
 
         cur = mix.app.get("Groq", {}).get("llm", {}).get("name", None)
         self.llm_groq.llm_groq_model = cur
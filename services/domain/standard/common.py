@@ -14,9 +14,8 @@ import asyncio
 import hashlib
 from loguru import logger
 from fastapi import (
-    Request, HTTPException
+    Request, Response, HTTPException
 )
-from schemas.cognitive import LicenseResponse
 from schemas.errors import BizError
 from services.domain.standard import signature
 from services.infrastructure.cache.upstash import UpStash
@@ -32,7 +31,7 @@ async def resolve_bootstrap(
     a: str,
     t: int,
     n: str
-) -> LicenseResponse:
+) -> Response:
 
     app_name, app_desc, *_ = a.lower().strip(), a, t, n
 
@@ -43,32 +42,27 @@ async def resolve_bootstrap(
 
     cache: UpStash = request.app.state.cache
 
-    if cached := await cache.get(cache_key):
-        logger.success(f"下发缓存激活配置 -> {cache_key}")
-        signed_data = signature.signature_license(
-            cached, private_key=f"{app_name}_{const.BASE_PRIVATE_KEY}"
-        )
-        return LicenseResponse(**signed_data)
-
     ttl = 86400
 
-    license_info = {
-        "configuration" : {},
-        "url"           : "https://api.appserverx.com/sign",
-        "ttl"           : ttl,
-        "region"        : x_app_region,
-        "version"       : x_app_version,
-        "message"       : "Use activation node"
-    }
-
-    signed_data = signature.signature_license(
-        license_info, private_key=f"{app_name}_{const.BASE_PRIVATE_KEY}"
+    async def build() -> dict:
+        logger.info(f"Redis cache -> {cache_key}")
+        return {
+            "configuration" : {},
+            "url"           : "https://api.appserverx.com/sign",
+            "ttl"           : ttl,
+            "region"        : x_app_region,
+            "version"       : x_app_version,
+            "message"       : "Use activation node"
+        }
+
+    license_info = await cache.get_or_compute(cache_key, build, ttl=ttl)
+
+    response = await signature.license_response(
+        request, license_info, private_key=f"{app_name}_{const.BASE_PRIVATE_KEY}", memo_key=cache_key
     )
-    await cache.set(cache_key, license_info, ex=ttl)
-    logger.info(f"Redis cache -> {cache_key}")
 
     logger.success(f"下发激活配置 -> Use activation node")
-    return LicenseResponse(**signed_data)
+    return response
 
 
 # workflow: configuration
@@ -77,7 +71,7 @@ async def resolve_configuration(
     a: str,
     t: int,
     n: str
-) -> LicenseResponse:
+) -> Response:
 
     app_name, app_desc, *_ = a.lower().strip(), a, t, n
 
@@ -88,35 +82,30 @@ async def resolve_configuration(
 
     cache: UpStash = request.app.state.cache
 
-    if cached := await cache.get(cache_key):
-        logger.info(f"下发缓存全局配置 -> {cache_key}")
-        signed_data = signature.signature_license(
-            cached, private_key=f"{app_name}_{const.BASE_PRIVATE_KEY}"
-        )
-        return LicenseResponse(**signed_data)
+    ttl = 86400
 
-    config      = toolset.resolve_template("data", const.CONFIGURATION)
-    config_dict = json.loads(config.read_text(encoding=const.CHARSET))
+    async def build() -> dict:
+        config      = toolset.resolve_template("data", const.CONFIGURATION)
+        config_dict = json.loads(config.read_text(encoding=const.CHARSET))
 
-    ttl = 86400
+        logger.info(f"Redis cache -> {cache_key}")
+        return {
+            "configuration" : config_dict.get(app_desc, {}),
+            "url"           : "",
+            "ttl"           : ttl,
+            "region"        : x_app_region,
+            "version"       : x_app_version,
+            "message"       : "Use global configuration"
+        }
 
-    license_info = {
-        "configuration" : config_dict.get(app_desc, {}),
-        "url"           : "",
-        "ttl"           : ttl,
-        "region"        : x_app_region,
-        "version"       : x_app_version,
-        "message"       : "Use global configuration"
-    }
+    license_info = await cache.get_or_compute(cache_key, build, ttl=ttl)
 
-    signed_data = signature.signature_license(
-        license_info, private_key=f"{app_name}_{const.BASE_PRIVATE_KEY}"
+    response = await signature.license_response(
+        request, license_info, private_key=f"{app_name}_{const.BASE_PRIVATE_KEY}", memo_key=cache_key
     )
-    await cache.set(cache_key, license_info, ex=ttl)
-    logger.info(f"Redis cache -> {cache_key}")
 
     logger.success(f"下发全局配置 -> Use global configuration")
-    return LicenseResponse(**signed_data)
+    return response
 
 
 # workflow: Keepalive Render
@@ -179,17 +168,16 @@ async def keepalive_supabase(request: Request) -> dict:
     params  = {"select": "id", "limit": 1}
 
     try:
-        async with httpx.AsyncClient(headers=supabase.headers, timeout=90) as client:
-            resp = await client.request("GET", supabase.url, params=params)
-            resp.raise_for_status()
-
-            logger.info("🟢 Supabase online")
-            return {
-                "status"      : "OK",
-                "message"     : "Supabase online",
-                "timestamp"   : int(time.time()),
-                "http_status" : resp.status_code
-            }
+        resp = await supabase.client.request("GET", supabase.url, params=params, timeout=90)
+        resp.raise_for_status()
+
+        logger.info("🟢 Supabase online")
+        return {
+            "status"      : "OK",
+            "message"     : "Supabase online",
+            "timestamp"   : int(time.time()),
+            "http_status" : resp.status_code
+        }
 
     except httpx.HTTPStatusError as e:
         logger.warning(f"🟡 Supabase offline: {e.response.status_code}")
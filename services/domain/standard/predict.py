@@ -7,11 +7,11 @@
 
 import time
 from loguru import logger
-from fastapi import Request
-from schemas.cognitive import (
-    LicenseResponse, Mix
+from fastapi import (
+    Request, Response
 )
 from services.domain.standard import signature
+from services.infrastructure.cache.mix_snapshot import MixSnapshot
 from services.infrastructure.cache.upstash import UpStash
 from utils import const
 
@@ -21,7 +21,7 @@ async def resolve_proxy_predict(
     a: str,
     t: int,
     n: str
-) -> LicenseResponse:
+) -> Response:
 
     app_name, app_desc, *_ = a.lower().strip(), a, t, n
 
@@ -30,10 +30,10 @@ async def resolve_proxy_predict(
 
     cache_key = f"{app_desc}:Predict"
 
-    cache: UpStash = request.app.state.cache
+    cache: UpStash        = request.app.state.cache
+    snapshot: MixSnapshot = request.app.state.snapshot
 
-    if mixed := await cache.get(const.K_MIX): mix = Mix(**mixed)
-    else: mix = Mix(**const.V_MIX)
+    mix = snapshot.bind(request)
 
     cur = mix.app.get("Modal", {}).get("inference", {}).get("enabled", False)
     logger.info(f"远程推理服务状态 -> {cur}")
@@ -45,10 +45,9 @@ async def resolve_proxy_predict(
     if cached := await cache.get(cache_key):
         if (previous := cached["available"]) == cur:
             logger.success(f"下发缓存推理服务 -> {cache_key}")
-            signed_data = signature.signature_license(
-                cached, private_key=f"{app_name}_{const.BASE_PRIVATE_KEY}"
+            return await signature.license_response(
+                request, cached, private_key=f"{app_name}_{const.BASE_PRIVATE_KEY}"
             )
-            return LicenseResponse(**signed_data)
 
         logger.info(f"推理服务状态变更 -> Cached={previous} Remote={cur}")
         await cache.delete(cache_key)
@@ -76,14 +75,14 @@ async def resolve_proxy_predict(
         "message"       : "Predict service online"
     }
 
-    signed_data = signature.signature_license(
-        license_info, private_key=f"{app_name}_{const.BASE_PRIVATE_KEY}"
+    response = await signature.license_response(
+        request, license_info, private_key=f"{app_name}_{const.BASE_PRIVATE_KEY}"
     )
-    await cache.set(cache_key, license_info, ex=ttl)
+    await cache.set(cache_key, license_info, ex=cache.jitter(ttl))
     logger.info(f"Redis cache -> {cache_key}")
 
     logger.success(f"下发推理服务 -> Predict service online")
-    return LicenseResponse(**signed_data)
+    return response
 
 
 if __name__ == '__main__':
@@ -6,24 +6,63 @@
 #
 
 import json
+import typing
 from loguru import logger
-from fastapi import Request
-from schemas.cognitive import LicenseResponse
+from fastapi import (
+    Request, Response
+)
 from schemas.errors import BizError
 from services.domain.standard import signature
+from services.infrastructure.cache.mix_snapshot import MixSnapshot
 from services.infrastructure.cache.upstash import UpStash
-from services.infrastructure.storage.r2_storage import R2Storage
+from services.infrastructure.storage.r2_storage import AsyncR2Storage
 from utils import (
     const, toolset
 )
 
 
+def download_items(entries: dict, names: list[str], prefix: str) -> tuple[list[str], list[tuple[str, str]]]:
+    """
+    组装批量签名的下载项：先是 `names` 对应的产物 `{prefix}/{filename}`，再是带 `manifest` 条目的分块清单。
+
+    Returns
+    -------
+    tuple[list[str], list[tuple[str, str]]]
+        (带分块清单的名称, [(对象 Key, 下载文件名), ...])
+    """
+    chunked = [name for name in names if entries[name].get("manifest")]
+    items   = [(f"{prefix}/{entries[name]['filename']}", entries[name]["filename"]) for name in names]
+    items  += [(entries[name]["manifest"]["key"], f"{name}.manifest.json") for name in chunked]
+
+    return chunked, items
+
+
+def attach_urls(
+    entries: dict, names: list[str], chunked: list[str], urls: list[str], links: typing.Optional[dict]
+) -> None:
+    """
+    按 `download_items` 的顺序回填 URL：产物写入 `url`，分块清单写入 `manifest_url`；
+    `links` 不为 None（detached 模式）时改写入 `links[name]` / `links["<name>.manifest"]`。
+    """
+    for name, url in zip(names, urls[:len(names)]):
+        if links is not None:
+            links[name] = url
+        else:
+            entries[name]["url"] = url
+
+    for name, url in zip(chunked, urls[len(names):]):
+        if links is not None:
+            links[f"{name}.manifest"] = url
+        else:
+            entries[name]["manifest_url"] = url
+
+
 async def resolve_template_download(
     request: Request,
     a: str,
     t: int,
     n: str
-) -> LicenseResponse:
+) -> Response:
     """
     📦 模板文件列表下发接口（带签名 License 元信息返回）
 
@@ -54,7 +93,7 @@ async def resolve_template_download(
     ==== Notes: Caching ====
     -------
     Redis key - {app_desc}:Template
-    Cache TTL - 86400s (1 day)
+    Cache TTL - 86400s (1 day)，进程内 L1 另缓存 60s
     命中直接返回，不再重复构建字典
 
     Returns
@@ -94,10 +133,7 @@ async def resolve_template_download(
 
     cache: UpStash = request.app.state.cache
 
-    if cached := await cache.get(cache_key):
-        logger.success(f"下发缓存模版元信息 -> {cache_key}")
-        license_info = cached
-    else:
+    async def build() -> dict:
         stencil_info = {
             "Framix": {
                 "template_atom_total.html": {
@@ -140,15 +176,17 @@ async def resolve_template_download(
             "version"  : x_app_version,
             "message"  : "Available templates for client to choose"
         }
-        await cache.set(cache_key, license_info, ex=ttl)
         logger.info(f"Redis cache -> {cache_key}")
+        return license_info
 
-    signed_data = signature.signature_license(
-        license_info, private_key=f"{app_name}_{const.BASE_PRIVATE_KEY}"
+    license_info = await cache.get_or_compute(cache_key, build, ttl=ttl)
+
+    response = await signature.license_response(
+        request, license_info, private_key=f"{app_name}_{const.BASE_PRIVATE_KEY}", memo_key=cache_key
     )
 
     logger.success(f"下发模版元信息 -> Available templates for client to choose")
-    return LicenseResponse(**signed_data)
+    return response
 
 
 async def resolve_toolkit_download(
@@ -157,7 +195,7 @@ async def resolve_toolkit_download(
     t: int,
     n: str,
     platform: str
-) -> LicenseResponse:
+) -> Response:
     """
     🛠 工具包下载索引元信息下发接口（含签名 License 返回）
 
@@ -191,7 +229,7 @@ async def resolve_toolkit_download(
     ==== Notes: Caching ====
     -------
     Redis Key - {App}:{Windows|MacOS}:Toolkit
-    Cache TTL - 86400s (1 Day)
+    Cache TTL - 86400s (1 Day)，进程内 L1 另缓存 60s
     生成下载 URL 时不缓存，确保每次返回的是有效签名链接
 
     Returns
@@ -221,6 +259,10 @@ async def resolve_toolkit_download(
     -----
     - `filename` 必须存在才会生成 URL
     - URL 有效期 1h，客户端需按需刷新
+    - Mix `app.R2.download.{App}` 为 `public` 时下发公共域名 + HMAC 令牌 URL，同一小时窗口内 URL 相同，可被 CDN 缓存
+    - 请求头 `X-License-Links: detached` 时 URL 移至响应体 `links` 字段，不参与签名
+    - 元信息含 `manifest`（分块清单引用 key/hash/chunks）时额外下发 `manifest_url`（detached 模式为 `links["<name>.manifest"]`），
+      客户端校验清单哈希后按 Range 从产物 URL 只下载本地缺失的块
     - 建议客户端比对 `hash/version` 判断是否需要更新
 
     Raises
@@ -238,13 +280,14 @@ async def resolve_toolkit_download(
 
     ttl = 86400
 
-    cache: UpStash = request.app.state.cache
-    r2: R2Storage  = request.app.state.r2
+    cache: UpStash        = request.app.state.cache
+    r2: AsyncR2Storage    = request.app.state.r2
+    snapshot: MixSnapshot = request.app.state.snapshot
 
-    if cached := await cache.get(cache_key):
-        logger.success(f"下发缓存工具元信息 -> {cache_key}")
-        license_info = cached
-    else:
+    mix  = snapshot.bind(request)
+    mode = mix.app.get("R2", {}).get("download", {}).get(app_desc) or const.R2_LINK_PRESIGN
+
+    async def build() -> dict:
         toolkit_info = {
             "Framix": {
                 "Windows": {
@@ -324,26 +367,35 @@ async def resolve_toolkit_download(
             "version" : x_app_version,
             "message" : "Available toolkits for client to choose"
         }
-        await cache.set(cache_key, license_info, ex=ttl)
         logger.info(f"Redis cache -> {cache_key}")
+        return license_info
+
+    license_info = await cache.get_or_compute(cache_key, build, ttl=ttl)
+
+    # 每次都重新签名 URL；detached 模式下 URL 不参与签名，签名结果可复用
+    detached = request.headers.get(const.LICENSE_LINKS, "").lower() == "detached"
+    links    = {}
+
+    # license_info 为 L1 共享对象，复制后再写入 URL；detached 模式直接签名共享对象，按 cache_key 复用摘要
+    shared       = license_info
+    toolkit      = {name: dict(tool) for name, tool in license_info.get("toolkit", {}).items()}
+    license_info = {**license_info, "toolkit": toolkit}
 
-    # 每次都重新签名 URL
-    toolkit = license_info.get("toolkit", {})
-    for name, tool in toolkit.items():
-        if not (filename := tool.get("filename")):
-            continue
-        tool["url"] = r2.signed_url_for_stream(
-            key=f"toolkit-store/{app_desc}/{group}/{filename}",
-            expires_in=3600,
-            disposition_filename=filename
-        )
-
-    signed_data = signature.signature_license(
-        license_info, private_key=f"{app_name}_{const.BASE_PRIVATE_KEY}"
+    names = [name for name, tool in toolkit.items() if tool.get("filename")]
+
+    # 带分块清单的条目额外下发清单 URL，客户端据此按 Range 增量下载
+    chunked, items = download_items(toolkit, names, f"toolkit-store/{app_desc}/{group}")
+
+    urls = await r2.download_urls(items, expires_in=3600, mode=mode)
+    attach_urls(toolkit, names, chunked, urls, links if detached else None)
+
+    response = await signature.license_response(
+        request, shared if detached else license_info, private_key=f"{app_name}_{const.BASE_PRIVATE_KEY}",
+        links=links if detached else None, memo_key=cache_key if detached else None
     )
 
     logger.success(f"下发工具元信息 -> Available models for client to choose")
-    return LicenseResponse(**signed_data)
+    return response
 
 
 async def resolve_model_download(
@@ -351,7 +403,7 @@ async def resolve_model_download(
     a: str,
     t: int,
     n: str
-) -> LicenseResponse:
+) -> Response:
     """
     🤖 模型资源下载索引下发接口（带 License 签名）
 
@@ -383,7 +435,7 @@ async def resolve_model_download(
     ==== Notes: Caching ====
     -------
     Redis Key - {App}:Models
-    Cache TTL - 86400s = 1day
+    Cache TTL - 86400s = 1day，进程内 L1 另缓存 60s
     ⚠ URL 不缓存，每次请求重新生成签名 URL，保证有效性
 
     Returns
@@ -414,6 +466,10 @@ async def resolve_model_download(
     Notes
     -----
     - 可通过 hash/version 做客户端本地模型缓存校验
+    - Mix `app.R2.download.{App}` 为 `public` 时下发公共域名 + HMAC 令牌 URL，同一小时窗口内 URL 相同，可被 CDN 缓存
+    - 请求头 `X-License-Links: detached` 时 URL 移至响应体 `links` 字段，不参与签名
+    - 元信息含 `manifest`（分块清单引用 key/hash/chunks）时额外下发 `manifest_url`（detached 模式为 `links["<name>.manifest"]`），
+      客户端校验清单哈希后按 Range 从产物 URL 只下载本地缺失的块
     - 大模型下载场景建议搭配 Streaming / Range Header 断点续传
     - License 与签名机制可接入授权/付费/灰度模型分发策略
 
@@ -436,13 +492,14 @@ async def resolve_model_download(
     faint_model = "Keras_Gray_W256_H256"
     color_model = "Keras_Hued_W256_H256"
 
-    cache: UpStash = request.app.state.cache
-    r2: R2Storage  = request.app.state.r2
+    cache: UpStash        = request.app.state.cache
+    r2: AsyncR2Storage    = request.app.state.r2
+    snapshot: MixSnapshot = request.app.state.snapshot
 
-    if cached := await cache.get(cache_key):
-        logger.success(f"下发缓存模型元信息 -> {cache_key}")
-        license_info = cached
-    else:
+    mix  = snapshot.bind(request)
+    mode = mix.app.get("R2", {}).get("download", {}).get(app_desc) or const.R2_LINK_PRESIGN
+
+    async def build() -> dict:
         license_info = {
             "models": {
                 faint_model: {
@@ -465,24 +522,35 @@ async def resolve_model_download(
             "version" : x_app_version,
             "message" : "Available models for client to choose"
         }
-
-        await cache.set(cache_key, license_info, ex=ttl)
         logger.info(f"Redis cache -> {cache_key}")
+        return license_info
+
+    license_info = await cache.get_or_compute(cache_key, build, ttl=ttl)
+
+    # 每次都重新签名 URL；detached 模式下 URL 不参与签名，签名结果可复用
+    detached = request.headers.get(const.LICENSE_LINKS, "").lower() == "detached"
+    links    = {}
+
+    # license_info 为 L1 共享对象，复制后再写入 URL；detached 模式直接签名共享对象，按 cache_key 复用摘要
+    shared       = license_info
+    models       = {name: dict(model) for name, model in license_info["models"].items()}
+    license_info = {**license_info, "models": models}
+
+    names = list(models)
+
+    # 带分块清单的条目额外下发清单 URL，客户端据此按 Range 增量下载
+    chunked, items = download_items(models, names, "model-store")
 
-    # 每次都重新签名 URL
-    for model in license_info["models"].values():
-        model["url"] = r2.signed_url_for_stream(
-            key=f"model-store/{model['filename']}",
-            expires_in=3600,
-            disposition_filename=model["filename"]
-        )
+    urls = await r2.download_urls(items, expires_in=3600, mode=mode)
+    attach_urls(models, names, chunked, urls, links if detached else None)
 
-    signed_data = signature.signature_license(
-        license_info, private_key=f"{app_name}_{const.BASE_PRIVATE_KEY}"
+    response = await signature.license_response(
+        request, shared if detached else license_info, private_key=f"{app_name}_{const.BASE_PRIVATE_KEY}",
+        links=links if detached else None, memo_key=cache_key if detached else None
     )
 
     logger.success(f"下发模型元信息 -> Available models for client to choose")
-    return LicenseResponse(**signed_data)
+    return response
 
 
 async def stencil_viewer(
@@ -11,6 +11,7 @@ import time
 import hmac
 import json
 import base64
+import typing
 import secrets
 import hashlib
 from pathlib import Path
@@ -22,17 +23,21 @@ from cryptography.hazmat.primitives import (
     hashes, serialization
 )
 from cryptography.hazmat.primitives.asymmetric import (
-    padding, rsa
+    ec, ed25519, padding, rsa
 )
-from fastapi import Request
-from schemas.cognitive import (
-    LicenseRequest, LicenseResponse
+from fastapi import (
+    Request, Response
 )
+from schemas.cognitive import LicenseRequest
 from schemas.errors import BizError
+from services.infrastructure.cache.signature_cache import SignatureCache
+from services.infrastructure.crypto.signer import Signer
 from services.infrastructure.db.supabase import Supabase
 from utils import (
     const, toolset
 )
+from utils.keyring import KeyRing
+from utils.ttl_cache import TTLCache
 
 env = toolset.current_env(
     const.SHARED_SECRET
@@ -40,6 +45,18 @@ env = toolset.current_env(
 
 shared_secret = env[const.SHARED_SECRET]
 
+key_ring = KeyRing()
+
+# activate_license RPC 状态 -> (HTTP 状态码, 提示)
+ACTIVATION_ERRORS = {
+    "invalid"   : (403, "[!] 通行证无效"),
+    "revoked"   : (403, "[!] 通行证已吊销"),
+    "expired"   : (403, "[!] 通行证已过期"),
+    "replay"    : (409, "[!] 重放请求被拒绝"),
+    "exhausted" : (403, "[!] 超过最大激活次数"),
+    "conflict"  : (423, "[!] 授权正在处理中")
+}
+
 
 def generate_keys() -> None:
     (key_folder := Path(__file__).resolve().parents[1] / const.KEYS_DIR).mkdir(exist_ok=True)
@@ -63,6 +80,30 @@ def generate_keys() -> None:
     return logger.success(f"✓ 密钥已生成 -> {key_folder}")
 
 
+def generate_sign_keys(app_name: str, alg: str = "ed25519") -> None:
+    (key_folder := Path(__file__).resolve().parents[1] / const.KEYS_DIR).mkdir(exist_ok=True)
+
+    private_key = ed25519.Ed25519PrivateKey.generate() if alg == "ed25519" else ec.generate_private_key(ec.SECP256R1())
+    public_key  = private_key.public_key()
+
+    key_file = f"{app_name.lower().strip()}_{const.SIGN_ALG_KEYS[alg]}"
+
+    private_pem = private_key.private_bytes(
+        encoding=serialization.Encoding.PEM,
+        format=serialization.PrivateFormat.PKCS8,
+        encryption_algorithm=serialization.NoEncryption()
+    )
+    (key_folder / key_file).write_bytes(private_pem)
+
+    public_pem = public_key.public_bytes(
+        encoding=serialization.Encoding.PEM,
+        format=serialization.PublicFormat.SubjectPublicKeyInfo
+    )
+    (key_folder / key_file.replace(const.BASE_PRIVATE_KEY, const.BASE_PUBLIC_KEY)).write_bytes(public_pem)
+
+    return logger.success(f"✓ {alg} 密钥已生成 -> {key_folder / key_file}")
+
+
 def generate_x_app_token(app_name: str, app_desc: str) -> str:
     x_app_token = signature_license(
         license_info={
@@ -87,12 +128,17 @@ def generate_shared_secret(length: int = 32) -> str:
 
 
 def decrypt_data(data: str, private_key: str) -> str:
-    private_key = toolset.load_private_key(private_key)
-    decrypted   = private_key.decrypt(
-        base64.b64decode(data), padding.PKCS1v15()
-    )
+    ciphertext = base64.b64decode(data)
 
-    return json.loads(decrypted)
+    # 轮换宽限期内依次尝试新旧私钥，旧公钥加密的数据仍可解开
+    *keys, last = key_ring.private_keys(private_key)
+    for key in keys:
+        try:
+            return json.loads(key.decrypt(ciphertext, padding.PKCS1v15()))
+        except ValueError:
+            continue
+
+    return json.loads(last.decrypt(ciphertext, padding.PKCS1v15()))
 
 
 def sign_token(app_id: str, expire_at: int) -> str:
@@ -105,7 +151,7 @@ def sign_token(app_id: str, expire_at: int) -> str:
 
 def signature_license(license_info: dict, private_key: str) -> dict:
     message_bytes = json.dumps(license_info, separators=(",", ":")).encode(const.CHARSET)
-    private_key   = toolset.load_private_key(private_key)
+    private_key   = key_ring.private_key(private_key)
     signature     = private_key.sign(
         message_bytes, padding.PKCS1v15(), hashes.SHA256()
     )
@@ -118,6 +164,74 @@ def signature_license(license_info: dict, private_key: str) -> dict:
     }
 
 
+def negotiate_alg(request: Request, private_key: str) -> tuple[str, str]:
+    """
+    按请求头 `X-App-Sign-Alg` 声明的顺序选择签名算法。
+
+    仅当应用配置了对应私钥（如 `{app}_ed25519_private_key.pem`）时才采用，否则回退 RSA。
+    """
+    prefix = private_key.removesuffix(const.BASE_PRIVATE_KEY)
+
+    for alg in request.headers.get(const.SIGN_ALG_HEADER, "").lower().split(","):
+        if (suffix := const.SIGN_ALG_KEYS.get(alg.strip())) and key_ring.has(key_file := prefix + suffix):
+            return alg.strip(), key_file
+
+    return const.SIGN_ALG_RSA, private_key
+
+
+async def license_response(
+    request: Request,
+    license_info: dict,
+    private_key: str,
+    links: typing.Optional[dict] = None,
+    memo: bool = True,
+    memo_key: typing.Optional[str] = None
+) -> Response:
+    """
+    签名并直接返回 `LicenseResponse` 结构的 JSON 响应。
+
+    - 相同私钥 + 相同载荷的签名结果由 `SignatureCache` 复用，命中时跳过 RSA 签名
+    - `links` 为不参与签名的附加字段（如每次请求重新生成的下载链接），追加在响应体末尾
+    - 载荷本身每次都不同时传 `memo=False`，避免污染缓存
+    - `memo_key`（通常为调用方的缓存 key）配合共享的载荷对象使用，命中时不再序列化载荷；
+      载荷对象必须视为只读
+    - RSA 签名交给 `Signer` 在线程池中执行，不阻塞事件循环
+    - 客户端声明支持 Ed25519 / ECDSA 且应用配置了对应私钥时改用该算法，响应体附带 `alg`
+    """
+    signatures: SignatureCache = request.app.state.signatures
+    signer: Signer             = request.app.state.signer
+
+    alg, private_key = negotiate_alg(request, private_key)
+
+    if not memo:
+        digest, message_bytes = None, signatures.serialize(license_info)
+    else:
+        digest, message_bytes = signatures.digest((memo_key, private_key) if memo_key else None, license_info)
+    cache_key = signatures.key(key_ring.kid(private_key), digest) if memo else None
+
+    if not memo or (body := await signatures.get(cache_key)) is None:
+        message_bytes = message_bytes or signatures.serialize(license_info)
+        signature     = await signer.sign(private_key, message_bytes)
+        signed        = {
+            "data"      : base64.b64encode(message_bytes).decode(),
+            "signature" : base64.b64encode(signature).decode()
+        }
+        if alg != const.SIGN_ALG_RSA:
+            signed["alg"] = alg
+        body = json.dumps(signed, separators=(",", ":")).encode(const.CHARSET)
+
+        logger.info(f"签名: {license_info}")
+        if memo:
+            await signatures.set(cache_key, body)
+    else:
+        logger.info(f"签名缓存命中 -> {cache_key}")
+
+    if links is not None:
+        body = body[:-1] + b',"links":' + json.dumps(links, separators=(",", ":")).encode(const.CHARSET) + b"}"
+
+    return Response(content=body, media_type="application/json")
+
+
 def verify_jwt(x_app_id: str, x_app_token: str) -> dict:
     logger.info(f"X-App-ID: {x_app_id}")
     logger.info(f"X-App-Token: {toolset.hide_string(x_app_token)}")
@@ -151,11 +265,9 @@ def verify_jwt(x_app_id: str, x_app_token: str) -> dict:
     exp = int(payload.get("exp", 0))
     iat = int(payload.get("iat", 0))
 
-    leeway = 30
-
-    if now > exp + leeway:
+    if now > exp + const.TOKEN_LEEWAY:
         raise ValueError("token expired")
-    if iat - now > leeway:
+    if iat - now > const.TOKEN_LEEWAY:
         raise ValueError("iat in the future")
 
     logger.info(f"验证通过: {payload}")
@@ -163,89 +275,92 @@ def verify_jwt(x_app_id: str, x_app_token: str) -> dict:
     return payload
 
 
-def manage_signature(req: LicenseRequest, request: Request) -> LicenseResponse:
+def verify_jwt_cached(token_cache: TTLCache, token_denied: TTLCache, x_app_id: str, x_app_token: str) -> dict:
+    """
+    带缓存的 `verify_jwt`。
+
+    - key 为 (X-App-ID, X-App-Token) 的 SHA-256 摘要，不保存明文 token
+    - 验证通过的条目在 `exp - leeway` 时过期
+    - 格式 / 签名 / 过期等确定性失败做负缓存，重复的坏 token 直接拒绝
+    - 负缓存使用独立的小容量 `token_denied`，大量不同的坏 token 不会挤出已验证的 token
+    """
+    digest = hashlib.sha256(f"{x_app_id}\0{x_app_token}".encode()).digest()
+
+    if (payload := token_cache.get(digest)) is not None:
+        return payload
+    if (reason := token_denied.get(digest)) is not None:
+        raise ValueError(reason)
+
+    try:
+        payload = verify_jwt(x_app_id, x_app_token)
+    except ValueError as e:
+        # iat 超前的 token 稍后会变为合法，不做负缓存
+        if str(e) != "iat in the future":
+            token_denied.set(digest, str(e), ttl=const.TOKEN_NEGATIVE_TTL)
+        raise
+
+    ttl = int(payload.get("exp", 0)) - const.TOKEN_LEEWAY - time.time()
+    token_cache.set(digest, payload, ttl=ttl)
+
+    return payload
+
+
+async def manage_signature(req: LicenseRequest, request: Request) -> Response:
     app_name        = req.a.lower().strip()
     app_desc        = req.a
     activation_code = req.code.strip()
 
     supabase: Supabase = request.app.state.supabase
 
-    # Notes: ==== 1) 通行证预检 ====
-    if not (codes := supabase.fetch_activation_code(app_desc, activation_code)):
-        raise BizError(status_code=403, detail=f"[!] 通行证无效")
-
-    if codes["is_revoked"]:
-        raise BizError(status_code=403, detail=f"[!] 通行证已吊销")
-
-    if datetime.now(timezone.utc).date() > datetime.fromisoformat(codes["expire"]).date():
-        raise BizError(status_code=403, detail=f"[!] 通行证已过期")
+    # Notes: ==== 0) 预检签名私钥，私钥不可用时不消耗激活次数 ====
+    private_key = f"{app_name}_{const.BASE_PRIVATE_KEY}"
+    try:
+        key_ring.private_key(key_file := negotiate_alg(request, private_key)[1])
+    except (OSError, ValueError) as e:
+        logger.error(f"签名私钥不可用 {key_file}: {e}")
+        raise BizError(status_code=500, detail="[!] 签名服务不可用")
 
-    if codes["pending"]:
-        raise BizError(status_code=423, detail=f"[!] 授权正在处理中")
+    # Notes: ==== 1) 通行证校验 + 激活状态迁移（单次 RPC，服务端 CAS） ====
+    issued = datetime.now(timezone.utc).isoformat()
 
-    if req.n == codes["last_nonce"]:
-        raise BizError(status_code=409, detail=f"[!] 重放请求被拒绝")
+    logger.info(f"cur_castle: {req.castle}")
+    logger.info(f"cur_license_id: {req.license_id}")
 
-    # Notes: ==== 2) 业务逻辑层 ====
-    pre_castle     = codes["castle"]
-    cur_castle     = req.castle
-    pre_license_id = codes["license_id"]
+    result = await supabase.activate_license(
+        app_desc, activation_code, req.castle, req.license_id, req.n, issued
+    )
 
-    # pending 正在处理授权请求
-    supabase.mark_code_pending(app_desc, activation_code)
+    if (status := result["status"]) in ACTIVATION_ERRORS:
+        status_code, detail = ACTIVATION_ERRORS[status]
+        raise BizError(status_code=status_code, detail=detail)
+
+    codes = result["code"]
+
+    # Notes: ==== 2) 生成 License File ====
+    license_info = {
+        "app"        : app_desc,
+        "code"       : activation_code,
+        "castle"     : req.castle,
+        "expire"     : codes["expire"],
+        "issued"     : issued,
+        "issued_at"  : codes["issued_at"] if status == "reissued" else issued,
+        "license_id" : codes["license_id"],
+        "interval"   : codes["interval"]
+    }
 
+    # 激活已提交，签名失败时回滚迁移，客户端重试不会再消耗一次激活次数
     try:
-        issued  = datetime.now(timezone.utc).isoformat()
-        payload = {"issued": issued}
-
-        logger.info(f"pre_castle: {pre_castle}")
-        logger.info(f"cur_castle: {cur_castle}")
-        logger.info(f"pre_license_id: {pre_license_id}")
-        logger.info(f"cur_license_id: {req.license_id}")
-
-        # 同设备重复激活
-        if codes["is_used"] and cur_castle == pre_castle and req.license_id == pre_license_id:
-            issued_at, license_id = codes["issued_at"], pre_license_id
-        else:
-            # 达到最大激活次数
-            if codes["activations"] >= codes["max_activations"]:
-                raise BizError(status_code=403, detail=f"[!] 超过最大激活次数")
-
-            issued_at  = issued
-            license_id = supabase.generate_license_id(app_desc, activation_code, issued)
-
-            payload.update({
-                "castle": cur_castle, "is_used": True, "activations": codes["activations"] + 1
-            })
-
-        # 生成 License File
-        license_info = {
-            "app"        : app_desc,
-            "code"       : activation_code,
-            "castle"     : cur_castle,
-            "expire"     : codes["expire"],
-            "issued"     : issued,
-            "issued_at"  : issued_at,
-            "license_id" : license_id,
-            "interval"   : codes["interval"]
-        }
-        license_data = signature_license(
-            license_info, private_key=f"{app_name}_{const.BASE_PRIVATE_KEY}"
-        )
-
-        # 更新状态
-        supabase.update_activation_status(
-            app_desc, activation_code, payload | {
-                "issued_at": issued_at, "last_nonce": req.n, "license_id": license_id
-            }
-        )
-
-        logger.success(f"下发 License file {license_info}")
-        return LicenseResponse(**license_data)
-
-    finally:
-        # 不管成功失败都要清除 pending 状态
-        supabase.wash_code_pending(app_desc, activation_code)
+        response = await license_response(request, license_info, private_key=private_key, memo=False)
+    except Exception as e:
+        logger.error(f"License 签名失败，回滚激活 -> {activation_code}: {e}")
+        try:
+            await supabase.release_license(app_desc, activation_code, req.n, result["previous"])
+        except Exception as ex:
+            logger.error(f"激活回滚失败 -> {activation_code}: {ex}")
+        raise
+
+    logger.success(f"下发 License file [{status}] {license_info}")
+    return response
 
 
 if __name__ == '__main__':
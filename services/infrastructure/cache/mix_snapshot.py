@@ -0,0 +1,126 @@
+#  __  __ _        ____                        _           _
+# |  \/  (_)_  __ / ___| _ __   __ _ _ __  ___| |__   ___ | |_
+# | |\/| | \ \/ / \___ \| '_ \ / _` | '_ \/ __| '_ \ / _ \| __|
+# | |  | | |>  <   ___) | | | | (_| | |_) \__ \ | | | (_) | |_
+# |_|  |_|_/_/\_\ |____/|_| |_|\__,_| .__/|___/_| |_|\___/ \__|
+#                                   |_|
+#
+
+import json
+import time
+import typing
+import asyncio
+import hashlib
+from loguru import logger
+from fastapi import Request
+from schemas.cognitive import Mix
+from services.infrastructure.cache.upstash import UpStash
+from utils import const
+
+
+class MixSnapshot(object):
+    """
+    进程内 Mix 热配置快照。
+
+    - 启动时从 Redis 拉取一次 `const.K_MIX`，之后仅在配置变更时重建 `Mix`
+    - 变更来源：Pub/Sub 频道 `const.K_MIX_CHANNEL` 与 Keyspace 通知
+    - 兜底：每 `const.MIX_POLL_INTERVAL` 秒轮询一次，防止通知丢失
+    - 每个请求通过 `bind` 固定一个版本，请求内只读一次
+    """
+
+    def __init__(self, cache: UpStash):
+        self.cache: UpStash = cache
+
+        self.mix: Mix = Mix(**const.V_MIX)
+        self.version: int = 0
+        self.digest: typing.Optional[str] = None
+        self.loaded_at: float = 0.0
+
+        self.tasks: list[asyncio.Task] = []
+        self.lock: asyncio.Lock = asyncio.Lock()
+
+    def __str__(self) -> str:
+        return f"<Mix Snapshot v{self.version}>"
+
+    __repr__ = __str__
+
+    def bind(self, request: Request) -> Mix:
+        """将当前快照绑定到请求，同一请求内多次调用返回同一版本。"""
+
+        if (mix := getattr(request.state, "mix", None)) is None:
+            request.state.mix = mix = self.mix
+        return mix
+
+    async def refresh(self) -> bool:
+        """从 Redis 重新拉取 Mix，内容未变化时不重建模型。"""
+
+        async with self.lock:
+            try:
+                mixed = await self.cache.get(const.K_MIX)
+            except Exception as e:
+                logger.warning(f"Mix 刷新失败，沿用 v{self.version}: {e}")
+                return False
+
+            source = mixed if mixed else const.V_MIX
+            digest = hashlib.sha256(
+                json.dumps(source, sort_keys=True, ensure_ascii=False).encode(const.CHARSET)
+            ).hexdigest()
+
+            self.loaded_at = time.time()
+            if digest == self.digest:
+                return False
+
+            self.mix     = Mix(**source)
+            self.digest  = digest
+            self.version += 1
+
+            logger.info(f"Mix 快照更新 -> v{self.version} ({digest[:12]})")
+            return True
+
+    async def publish(self, value: dict) -> None:
+        """写入新的 Mix 并通知所有 worker 刷新。"""
+
+        async with self.cache.pipeline() as pipe:
+            # Mix 需要人工查看与编辑，保持纯 JSON 文本
+            pipe.set(const.K_MIX, value, ex=None, fmt="json")
+            pipe.publish(const.K_MIX_CHANNEL, str(int(time.time())))
+
+    async def listen(self) -> None:
+        keyspace = f"__keyspace@*__:{const.K_MIX}"
+
+        while True:
+            pubsub = self.cache.client.pubsub(ignore_subscribe_messages=True)
+            try:
+                await pubsub.subscribe(const.K_MIX_CHANNEL)
+                await pubsub.psubscribe(keyspace)
+                async for message in pubsub.listen():
+                    if message["type"] in ("message", "pmessage"):
+                        await self.refresh()
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                logger.warning(f"Mix 订阅中断，降级为轮询: {e}")
+                await asyncio.sleep(const.MIX_POLL_INTERVAL)
+            finally:
+                await pubsub.aclose()
+
+    async def poll(self) -> None:
+        while True:
+            await asyncio.sleep(const.MIX_POLL_INTERVAL)
+            await self.refresh()
+
+    async def start(self) -> None:
+        await self.refresh()
+        self.tasks = [
+            asyncio.create_task(self.listen()), asyncio.create_task(self.poll())
+        ]
+
+    async def stop(self) -> None:
+        for task in self.tasks:
+            task.cancel()
+        await asyncio.gather(*self.tasks, return_exceptions=True)
+        self.tasks.clear()
+
+
+if __name__ == '__main__':
+    pass
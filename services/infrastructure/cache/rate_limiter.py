@@ -0,0 +1,318 @@
+#  ____       _         _     _           _ _
+# |  _ \ __ _| |_ ___  | |   (_)_ __ ___ (_) |_ ___ _ __
+# | |_) / _` | __/ _ \ | |   | | '_ ` _ \| | __/ _ \ '__|
+# |  _ < (_| | ||  __/ | |___| | | | | | | | ||  __/ |
+# |_| \_\__,_|\__\___| |_____|_|_| |_| |_|_|\__\___|_|
+#
+
+import time
+import typing
+import asyncio
+import hashlib
+import collections
+from loguru import logger
+from redis.exceptions import NoScriptError
+from services.infrastructure.cache.upstash import UpStash
+from utils import const
+
+
+class RateRule(object):
+    """
+    预编译后的单条限流规则。
+
+    config : 合并后的原始配置，用于日志与 429 响应
+    key_by : 限流维度，`ip` 按客户端 IP，`app` 按 X-App-ID
+    """
+
+    __slots__ = ("burst", "rate", "max_wait", "error_budget", "key_by", "config")
+
+    def __init__(self, config: dict):
+        self.config: dict = config
+        self.burst: float = config.get("burst", 10)
+        self.rate: float = config.get("rate", 2)
+        self.max_wait: float = config.get("max_wait", 1)
+        self.error_budget: float = config.get("error_budget", const.RATE_ERROR_BUDGET)
+        self.key_by: str = config.get("key_by", "ip")
+
+    def __str__(self) -> str:
+        return f"<RateRule {self.config}>"
+
+    __repr__ = __str__
+
+
+class RateRules(object):
+    """
+    `Mix.rate_config` 的查找表。
+
+    default / routes 在编译期合并为每个路由一条规则，
+    ip 覆盖项较少，命中时按 (route, ip) 懒合并并缓存。
+    """
+
+    def __init__(self, config: dict):
+        self.default: dict = config.get("default", {})
+        self.ip: dict[str, dict] = config.get("ip", {})
+
+        self.fallback: RateRule = RateRule(self.default)
+        self.routes: dict[str, RateRule] = {
+            route: RateRule({**self.default, **route_config})
+            for route, route_config in config.get("routes", {}).items()
+        }
+        self.overrides: dict[tuple[str, str], RateRule] = {}
+
+    def lookup(self, route: str, ip: str) -> RateRule:
+        rule = self.routes.get(route, self.fallback)
+        if ip not in self.ip:
+            return rule
+        if (override := self.overrides.get((route, ip))) is None:
+            override = self.overrides[(route, ip)] = RateRule({**rule.config, **self.ip[ip]})
+        return override
+
+
+class LocalBucket(object):
+    """
+    单 worker 内的令牌桶。
+
+    tokens  : 本地估算的剩余令牌
+    pending : 已在本地放行、尚未同步到 Redis 的令牌数
+    synced  : 是否已与 Redis 对齐过一次（新桶首个请求走 Redis）
+    """
+
+    __slots__ = ("burst", "rate", "tokens", "stamp", "pending", "synced")
+
+    def __init__(self, burst: float, rate: float, now: float):
+        self.burst: float = burst
+        self.rate: float = rate
+        self.tokens: float = burst
+        self.stamp: float = now
+        self.pending: int = 0
+        self.synced: bool = False
+
+    def refill(self, now: float) -> None:
+        if (delta := now - self.stamp) > 0:
+            self.tokens = min(self.burst, self.tokens + delta * self.rate)
+            self.stamp = now
+
+    def idle(self, now: float) -> bool:
+        return self.pending == 0 and now - self.stamp > self.burst / self.rate + 2
+
+
+class WaitQueue(object):
+    """
+    单 key 的 FIFO 等待队列。
+
+    waiters : 按到达顺序排队的 Future
+    next_at : 下一个令牌预计可用的时刻（monotonic）
+    """
+
+    __slots__ = ("waiters", "next_at", "task")
+
+    def __init__(self):
+        self.waiters: collections.deque[asyncio.Future] = collections.deque()
+        self.next_at: float = 0.0
+        self.task: typing.Optional[asyncio.Task] = None
+
+    def head(self) -> typing.Optional[asyncio.Future]:
+        while self.waiters and self.waiters[0].done():
+            self.waiters.popleft()
+        return self.waiters[0] if self.waiters else None
+
+
+class RateLimiter(object):
+    """
+    本地优先 + Redis 批量对账的混合限流器（GCRA）。
+
+    - 本地令牌充足（高于 `burst * error_budget`）时直接本地放行，不访问 Redis
+    - 接近上限时以 Redis 为准，先提交本地欠账再原子扣减
+    - 后台每 `const.RATE_SYNC_INTERVAL` 秒以 pipeline 批量提交欠账并回写远端余量
+    - 令牌不足时进入按 key 的 FIFO 队列，按 Redis 返回的精确等待时间依次唤醒，
+      预计等待超过 `max_wait` 的请求直接拒绝
+    - Redis 侧只存一个 TAT 时间戳，脚本启动时加载一次，之后走 EVALSHA
+    """
+
+    def __init__(self, cache: UpStash):
+        self.cache: UpStash = cache
+        self.sha: str = hashlib.sha1(const.RATE_LIMIT_LUA.encode(const.CHARSET)).hexdigest()
+
+        self.buckets: dict[str, LocalBucket] = {}
+        self.queues: dict[str, WaitQueue] = {}
+        self.compiled: tuple[int, typing.Optional[RateRules]] = (-1, None)
+        self.task: typing.Optional[asyncio.Task] = None
+
+    def __str__(self) -> str:
+        return f"<Rate Limiter buckets={len(self.buckets)}>"
+
+    __repr__ = __str__
+
+    def rules(self, version: int, config: dict) -> RateRules:
+        """按 Mix 快照版本编译规则表，版本不变时复用。"""
+
+        if self.compiled[0] != version or self.compiled[1] is None:
+            self.compiled = (version, RateRules(config))
+        return self.compiled[1]
+
+    @staticmethod
+    def key(route: str, ident: str) -> str:
+        """跨进程稳定的限流 key（不依赖随机化的内置 hash）。"""
+
+        route_digest = hashlib.blake2b(route.encode(const.CHARSET), digest_size=6).hexdigest()
+        ident_digest = hashlib.blake2b(ident.encode(const.CHARSET), digest_size=8).hexdigest()
+        return f"rl:{route_digest}:{ident_digest}"
+
+    def bucket(self, key: str, burst: float, rate: float, now: float) -> LocalBucket:
+        if (bucket := self.buckets.get(key)) is None or (bucket.burst, bucket.rate) != (burst, rate):
+            bucket = self.buckets[key] = LocalBucket(burst, rate, now)
+        return bucket
+
+    async def evalsha(self, *args: typing.Any) -> typing.Any:
+        try:
+            return await self.cache.client.evalsha(self.sha, 1, *args)
+        except NoScriptError:
+            self.sha = await self.cache.client.script_load(const.RATE_LIMIT_LUA)
+            return await self.cache.client.evalsha(self.sha, 1, *args)
+
+    async def acquire(self, key: str, rule: RateRule) -> tuple[float, float]:
+        """
+        申请一个令牌，必要时排队等待。
+
+        Returns
+        -------
+        tuple[float, float]
+            (剩余令牌数, 建议重试秒数)；剩余令牌数小于 0 表示被拒绝
+        """
+        now    = time.monotonic()
+        bucket = self.bucket(key, rule.burst, rule.rate, now)
+        queue  = self.queues.get(key)
+
+        if queue is None or queue.head() is None:
+            tokens, wait = await self.try_acquire(key, bucket, rule.error_budget)
+            if tokens >= 0:
+                return tokens, 0.0
+            queue = self.queues.setdefault(key, WaitQueue())
+            queue.next_at = time.monotonic() + wait
+
+        estimate = max(queue.next_at - time.monotonic(), 0.0) + len(queue.waiters) / rule.rate
+        if estimate > rule.max_wait:
+            return -1.0, estimate
+
+        waiter = asyncio.get_running_loop().create_future()
+        queue.waiters.append(waiter)
+        if queue.task is None or queue.task.done():
+            queue.task = asyncio.create_task(self.drain(key, bucket, queue, rule.error_budget))
+
+        return await waiter, 0.0
+
+    async def try_acquire(self, key: str, bucket: LocalBucket, error_budget: float) -> tuple[float, float]:
+        bucket.refill(time.monotonic())
+
+        if bucket.synced and bucket.tokens - 1 >= bucket.burst * error_budget:
+            bucket.tokens  -= 1
+            bucket.pending += 1
+            return bucket.tokens, 0.0
+
+        return await self.authority(key, bucket)
+
+    async def authority(self, key: str, bucket: LocalBucket) -> tuple[float, float]:
+        pending, bucket.pending = bucket.pending, 0
+
+        try:
+            granted, tokens, wait_ms = await self.evalsha(
+                key, bucket.burst, bucket.rate, int(time.time() * 1000), pending, 1
+            )
+        except Exception:
+            bucket.pending += pending
+            raise
+
+        bucket.tokens = max(float(tokens), 0.0)
+        bucket.synced = True
+
+        if int(granted):
+            return bucket.tokens, 0.0
+        return -1.0, int(wait_ms) / 1000
+
+    async def drain(self, key: str, bucket: LocalBucket, queue: WaitQueue, error_budget: float) -> None:
+        try:
+            while queue.head() is not None:
+                await asyncio.sleep(max(queue.next_at - time.monotonic(), 0.0))
+
+                if queue.head() is None:
+                    break
+
+                tokens, wait = await self.try_acquire(key, bucket, error_budget)
+                if tokens >= 0:
+                    if (waiter := queue.head()) is not None:
+                        queue.waiters.popleft()
+                        waiter.set_result(tokens)
+                    queue.next_at = time.monotonic()
+                else:
+                    queue.next_at = time.monotonic() + wait
+
+        except Exception as e:
+            while queue.waiters:
+                if not (waiter := queue.waiters.popleft()).done():
+                    waiter.set_exception(e)
+
+        finally:
+            if not queue.waiters:
+                self.queues.pop(key, None)
+
+    async def sync(self) -> None:
+        now   = time.monotonic()
+        dirty = [(k, b, b.pending) for k, b in self.buckets.items() if b.pending > 0]
+
+        for key in [k for k, b in self.buckets.items() if b.idle(now)]:
+            self.buckets.pop(key, None)
+
+        if not dirty:
+            return None
+
+        for _, bucket, _ in dirty:
+            bucket.pending = 0
+
+        stamp = int(time.time() * 1000)
+
+        async def flush() -> list:
+            pipe = self.cache.client.pipeline(transaction=False)
+            for k, b, p in dirty:
+                pipe.evalsha(self.sha, 1, k, b.burst, b.rate, stamp, p, 0)
+            return await pipe.execute()
+
+        try:
+            try:
+                results = await flush()
+            except NoScriptError:
+                self.sha = await self.cache.client.script_load(const.RATE_LIMIT_LUA)
+                results = await flush()
+        except Exception as e:
+            for _, bucket, pending in dirty:
+                bucket.pending += pending
+            return logger.warning(f"限流对账失败，保留本地欠账: {e}")
+
+        for (_, bucket, _), (_, tokens, _) in zip(dirty, results):
+            bucket.refill(time.monotonic())
+            bucket.tokens = min(bucket.tokens, max(float(tokens), 0.0))
+
+    async def loop(self) -> None:
+        while True:
+            await asyncio.sleep(const.RATE_SYNC_INTERVAL)
+            await self.sync()
+
+    async def start(self) -> None:
+        try:
+            self.sha = await self.cache.client.script_load(const.RATE_LIMIT_LUA)
+        except Exception as e:
+            logger.warning(f"限流脚本预加载失败，首次调用时重试: {e}")
+        self.task = asyncio.create_task(self.loop())
+
+    async def stop(self) -> None:
+        for queue in self.queues.values():
+            if queue.task:
+                queue.task.cancel()
+        if self.task:
+            self.task.cancel()
+            await asyncio.gather(self.task, return_exceptions=True)
+            self.task = None
+        await self.sync()
+
+
+if __name__ == '__main__':
+    pass
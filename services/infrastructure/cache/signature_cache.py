@@ -0,0 +1,102 @@
+#  ____  _                   _                     ____           _
+# / ___|(_) __ _ _ __   __ _| |_ _   _ _ __ ___   / ___|__ _  ___| |__   ___
+# \___ \| |/ _` | '_ \ / _` | __| | | | '__/ _ \ | |   / _` |/ __| '_ \ / _ \
+#  ___) | | (_| | | | | (_| | |_| |_| | | |  __/ | |__| (_| | (__| | | |  __/
+# |____/|_|\__, |_| |_|\__,_|\__|\__,_|_|  \___|  \____\__,_|\___|_| |_|\___|
+#          |___/
+#
+
+import json
+import typing
+import hashlib
+from loguru import logger
+from services.infrastructure.cache.upstash import UpStash
+from utils import const
+from utils.ttl_cache import TTLCache
+
+
+class SignatureCache(object):
+    """
+    签名结果的内容寻址缓存。
+
+    - key 为 (kid, 规范 JSON 字节的 SHA-256)，载荷或私钥任一变化都会换 key
+    - 值为最终响应体字节 `{"data": ..., "signature": ...}`，命中时无需再序列化和 RSA 签名
+    - 一级为进程内 LRU；`const.SIGN_CACHE_REDIS` 打开时以 Redis 作为跨 worker 的二级缓存
+    - 调用方传入 `memo_key` 时按 (memo_key, 私钥) 记住载荷对象与其摘要；再次传入同一个对象
+      （如 UpStash L1 命中返回的共享 dict）直接复用摘要，命中路径不再序列化载荷
+    """
+
+    def __init__(
+        self,
+        cache: UpStash,
+        maxsize: int = const.SIGN_CACHE_SIZE,
+        ttl: int = const.SIGN_CACHE_TTL,
+        remote: bool = const.SIGN_CACHE_REDIS
+    ):
+        self.cache: UpStash = cache
+        self.ttl: int = ttl
+        self.remote: bool = remote
+        self.local: TTLCache = TTLCache(maxsize=maxsize, ttl=ttl)
+        self.digests: TTLCache = TTLCache(maxsize=maxsize, ttl=ttl)
+
+    def __str__(self) -> str:
+        return f"<Signature Cache {self.local}>"
+
+    __repr__ = __str__
+
+    @staticmethod
+    def key(kid: str, digest: str) -> str:
+        return f"Sig:{kid}:{digest}"
+
+    @staticmethod
+    def serialize(license_info: dict) -> bytes:
+        return json.dumps(license_info, separators=(",", ":")).encode(const.CHARSET)
+
+    def digest(
+        self, memo_key: typing.Optional[typing.Hashable], license_info: dict
+    ) -> tuple[str, typing.Optional[bytes]]:
+        """
+        Returns
+        -------
+        tuple[str, bytes | None]
+            (载荷 SHA-256, 载荷字节)；按 memo_key 命中同一对象时载荷字节为 None，需要签名时再序列化
+        """
+        if memo_key is not None and (entry := self.digests.get(memo_key)) is not None and entry[0] is license_info:
+            return entry[1], None
+
+        message_bytes = self.serialize(license_info)
+        digest        = hashlib.sha256(message_bytes).hexdigest()
+
+        # 持有对象引用，保证 `is` 比较不会因 id 复用而误判
+        if memo_key is not None:
+            self.digests.set(memo_key, (license_info, digest))
+
+        return digest, message_bytes
+
+    async def get(self, key: str) -> typing.Optional[bytes]:
+        if (body := self.local.get(key)) is not None or not self.remote:
+            return body
+
+        try:
+            if (val := await self.cache.client.get(key)) is None:
+                return None
+        except Exception as e:
+            return logger.warning(f"签名缓存读取失败 {key}: {e}")
+
+        self.local.set(key, body := val.encode(const.CHARSET))
+        return body
+
+    async def set(self, key: str, body: bytes) -> None:
+        self.local.set(key, body)
+
+        if not self.remote:
+            return None
+
+        try:
+            await self.cache.client.set(key, body.decode(const.CHARSET), ex=self.ttl)
+        except Exception as e:
+            logger.warning(f"签名缓存写入失败 {key}: {e}")
+
+
+if __name__ == '__main__':
+    pass
@@ -6,12 +6,95 @@
 #       |_|
 #
 
-import json
+import math
+import time
+import random
 import typing
+import asyncio
+import contextlib
 import redis.asyncio as aioredis
+from loguru import logger
 from utils import (
-    const, toolset
+    codec, const, toolset
 )
+from utils.ttl_cache import TTLCache
+
+_MISSING = object()
+
+XFETCH_MARK = "__xfetch__"
+
+
+class UpStashPipeline(object):
+    """
+    `UpStash.pipeline()` 的命令缓冲。
+
+    get / set / delete 与 `UpStash` 同名方法语义一致（经 `utils.codec` 编解码），
+    其余命令透传给底层 redis pipeline，结果原样返回。
+
+    传入 `local` 时 set / delete 涉及的 key 在入队与提交后都会从 L1 剔除，
+    避免提交前并发回填的旧值继续被读到。
+    """
+
+    def __init__(self, pipe: typing.Any, local: typing.Optional[TTLCache] = None):
+        self.pipe = pipe
+        self.local: typing.Optional[TTLCache] = local
+        self.decoders: list[typing.Callable[[typing.Any], typing.Any]] = []
+        self.results: list[typing.Any] = []
+        self.touched: set[str] = set()
+
+    def __getattr__(self, name: str) -> typing.Callable[..., "UpStashPipeline"]:
+        command = getattr(self.pipe, name)
+
+        def queue(*args, **kwargs) -> "UpStashPipeline":
+            command(*args, **kwargs)
+            self.decoders.append(lambda r: r)
+            return self
+
+        return queue
+
+    def get(self, key: str) -> "UpStashPipeline":
+        self.pipe.get(key)
+        self.decoders.append(codec.decode)
+        return self
+
+    def set(
+        self, key: str, value: typing.Any, ex: typing.Optional[int] = 60, fmt: str = const.CACHE_CODEC
+    ) -> "UpStashPipeline":
+        self.pipe.set(key, codec.encode(value, fmt), ex=ex)
+        self.decoders.append(bool)
+        self.evict(key)
+        return self
+
+    def delete(self, *keys: str) -> "UpStashPipeline":
+        self.pipe.delete(*keys)
+        self.decoders.append(lambda r: r)
+        self.evict(*keys)
+        return self
+
+    def evict(self, *keys: str) -> None:
+        if self.local is None:
+            return None
+        for key in keys:
+            self.local.pop(key)
+        self.touched.update(keys)
+
+    async def execute(self) -> list[typing.Any]:
+        if not self.decoders:
+            return self.results
+
+        try:
+            raw, decoders = await self.pipe.execute(), self.decoders
+        finally:
+            # 提交期间可能有并发 fill 把旧值回填进 L1
+            if self.local is not None:
+                for key in self.touched:
+                    self.local.pop(key)
+            self.touched = set()
+
+        self.decoders = []
+        self.results  = [d(r) for d, r in zip(decoders, raw)]
+        return self.results
+
 
 env = toolset.current_env(
     const.REDIS_CACHE_URL, const.REDIS_CACHE_KEY
@@ -22,6 +105,15 @@ redis_cache_key = env[const.REDIS_CACHE_KEY]
 
 
 class UpStash(object):
+    """
+    Upstash Redis 客户端。
+
+    `get` / `set` / `delete` 直连 Redis，值经 `utils.codec` 编解码（带格式标记，兼容旧的纯 JSON）；
+    热 key 使用两级缓存：
+    - L1 为进程内 LRU（`const.UPSTASH_L1_SIZE` 条，最长 `const.UPSTASH_L1_TTL` 秒）
+    - L2 为 Redis
+    - `get_or_compute` 在进程内按 key 合并并发未命中，只有一个协程执行 `factory`
+    """
 
     def __init__(self):
         self.client = aioredis.Redis.from_url(
@@ -29,22 +121,204 @@ class UpStash(object):
             decode_responses=True,
             encoding=const.CHARSET
         )
+        # 缓存值为二进制编码，使用不解码响应的独立连接
+        self.binary = aioredis.Redis.from_url(
+            url=f"rediss://default:{redis_cache_key}@{redis_cache_url}",
+            decode_responses=False
+        )
+
+        self.local: TTLCache = TTLCache(maxsize=const.UPSTASH_L1_SIZE, ttl=const.UPSTASH_L1_TTL)
+        self.inflight: dict[str, asyncio.Task] = {}
+        self.refreshing: set[str] = set()
+
+        self.l2_hits: int = 0
+        self.l2_misses: int = 0
+        self.computes: int = 0
+        self.refreshes: int = 0
 
     async def get(self, key: str) -> typing.Optional[typing.Union[dict, list, str, int, float]]:
-        if (val := await self.client.get(key)) is None:
-            return None
-        try:
-            return json.loads(val)
-        except (json.JSONDecodeError, TypeError):
-            return val
+        return codec.decode(await self.binary.get(key))
 
-    async def set(self, key: str, value: typing.Any, ex: int = 60) -> typing.Optional[bool]:
-        val = json.dumps(value, ensure_ascii=False)
-        return bool(await self.client.set(key, val, ex=ex))
+    async def set(
+        self, key: str, value: typing.Any, ex: typing.Optional[int] = 60, fmt: str = const.CACHE_CODEC
+    ) -> typing.Optional[bool]:
+        self.local.pop(key)
+        try:
+            return bool(await self.binary.set(key, codec.encode(value, fmt), ex=ex))
+        finally:
+            # 写入期间可能有并发 fill 把旧值回填进 L1
+            self.local.pop(key)
 
     async def delete(self, key: str) -> typing.Optional[int]:
+        self.local.pop(key)
         return await self.client.delete(key)
 
+    async def get_many(self, keys: list[str]) -> list[typing.Optional[typing.Union[dict, list, str, int, float]]]:
+        """MGET 一次取回多个 key，结果顺序与 `keys` 一致，缺失为 None。"""
+
+        if not keys:
+            return []
+        return [codec.decode(val) for val in await self.binary.mget(keys)]
+
+    async def set_many(self, mapping: dict[str, typing.Any], ex: typing.Optional[int] = 60) -> list[bool]:
+        """单次 pipeline 写入多个 key，每个 key 使用相同的过期时间。"""
+
+        async with self.pipeline() as pipe:
+            for key, value in mapping.items():
+                pipe.set(key, value, ex=ex)
+        return pipe.results
+
+    @contextlib.asynccontextmanager
+    async def pipeline(self, transaction: bool = False) -> typing.AsyncIterator[UpStashPipeline]:
+        """
+        批量命令上下文，退出时一次往返提交。
+
+        Examples
+        --------
+        async with cache.pipeline() as pipe:
+            pipe.get("a").get("b").set("c", {"x": 1}, ex=60)
+        a, b, ok = pipe.results
+        """
+        async with self.binary.pipeline(transaction=transaction) as raw:
+            pipe = UpStashPipeline(raw, self.local)
+            yield pipe
+            await pipe.execute()
+
+    @staticmethod
+    def jitter(ttl: int, ratio: float = const.CACHE_TTL_JITTER) -> int:
+        """在 [ttl * (1 - ratio), ttl] 内随机取过期时间，避免同批写入的 key 同时过期。"""
+
+        return max(1, int(ttl * (1 - random.uniform(0, ratio))))
+
+    @staticmethod
+    def early(delta: float, expiry: float, beta: float = const.XFETCH_BETA) -> bool:
+        """XFetch：越接近过期、重建越慢，越可能提前刷新。"""
+
+        return time.time() - delta * beta * math.log(random.random() or 1e-12) >= expiry
+
+    async def get_or_compute(
+        self,
+        key: str,
+        factory: typing.Callable[[], typing.Awaitable[typing.Any]],
+        ttl: int = 60
+    ) -> typing.Any:
+        """
+        依次读取 L1 → L2，均未命中时调用 `factory` 生成并回写两级缓存。
+
+        - 写入 L2 的过期时间带 `const.CACHE_TTL_JITTER` 抖动
+        - 条目记录重建耗时与过期时刻，临近过期时按 XFetch 概率由少数请求在后台提前重建，
+          其余请求继续读取旧值；重建耗时以 `ttl * const.XFETCH_DELTA_RATIO` 为下限
+        - 后台重建期间 L1 到期的请求直接读取 L2 旧值；重建失败时等待者共用一个回源任务
+        - 返回值会被 L1 共享，调用方不应原地修改
+        """
+        if (entry := self.local.get(key, _MISSING)) is _MISSING:
+            # 后台刷新期间 L1 到期：直接返回 L2 中的旧值，不等待刷新
+            if key in self.refreshing and (entry := await self.load(key)) is not None:
+                return entry[0]
+
+            # shield: 单个请求被取消时不影响其他等待同一 key 的请求
+            if (entry := await asyncio.shield(self.single(key, lambda: self.fill(key, factory, ttl)))) is None:
+                # 等到的是失败的后台刷新，所有等待者共用一个回源任务
+                entry = await asyncio.shield(self.single(key, lambda: self.fill(key, factory, ttl)))
+
+        value, delta, expiry = entry
+
+        if delta and key not in self.inflight and self.early(delta, expiry):
+            self.refreshing.add(key)
+            self.single(key, lambda: self.refresh(key, factory, ttl))
+
+        return value
+
+    def single(self, key: str, start: typing.Callable[[], typing.Awaitable[typing.Any]]) -> asyncio.Task:
+        """返回 key 上正在执行的任务，没有则以 `start` 创建一个（进程内 single-flight）。"""
+
+        if (task := self.inflight.get(key)) is None:
+            task = self.inflight[key] = asyncio.create_task(start())
+            task.add_done_callback(lambda t: self.inflight.pop(key) if self.inflight.get(key) is t else None)
+        return task
+
+    async def load(self, key: str) -> typing.Optional[tuple[typing.Any, float, float]]:
+        if (stored := await self.get(key)) is None:
+            self.l2_misses += 1
+            return None
+
+        self.l2_hits += 1
+        if isinstance(stored, dict) and XFETCH_MARK in stored:
+            entry = (stored["value"], stored["delta"], stored["expiry"])
+        else:
+            # 旧格式的值没有重建耗时，只在过期后重建
+            entry = (stored, 0.0, 0.0)
+
+        self.local.set(key, entry, ttl=self.local_ttl(entry))
+        return entry
+
+    async def fill(
+        self,
+        key: str,
+        factory: typing.Callable[[], typing.Awaitable[typing.Any]],
+        ttl: int
+    ) -> tuple[typing.Any, float, float]:
+        if (entry := await self.load(key)) is None:
+            return await self.compute(key, factory, ttl)
+        return entry
+
+    async def compute(
+        self,
+        key: str,
+        factory: typing.Callable[[], typing.Awaitable[typing.Any]],
+        ttl: int
+    ) -> tuple[typing.Any, float, float]:
+        start = time.perf_counter()
+        value = await factory()
+        # 重建耗时通常远小于 ttl，按 ttl 比例给出下限，提前刷新才能分散在过期前数秒内
+        delta = max(time.perf_counter() - start, const.XFETCH_MIN_DELTA, ttl * const.XFETCH_DELTA_RATIO)
+
+        ex    = self.jitter(ttl)
+        entry = (value, delta, time.time() + ex)
+
+        await self.set(key, {XFETCH_MARK: 1, "value": value, "delta": delta, "expiry": entry[2]}, ex=ex)
+        self.local.set(key, entry, ttl=self.local_ttl(entry))
+        self.computes += 1
+
+        return entry
+
+    async def refresh(
+        self,
+        key: str,
+        factory: typing.Callable[[], typing.Awaitable[typing.Any]],
+        ttl: int
+    ) -> typing.Optional[tuple[typing.Any, float, float]]:
+        try:
+            entry = await self.compute(key, factory, ttl)
+        except Exception as e:
+            return logger.warning(f"缓存提前刷新失败 {key}: {e}")
+        finally:
+            self.refreshing.discard(key)
+
+        self.refreshes += 1
+        logger.info(f"缓存提前刷新 -> {key}")
+        return entry
+
+    @staticmethod
+    def local_ttl(entry: tuple[typing.Any, float, float]) -> float:
+        if not (expiry := entry[2]):
+            return const.UPSTASH_L1_TTL
+        return min(const.UPSTASH_L1_TTL, expiry - time.time())
+
+    def stats(self) -> dict:
+        l2_total = self.l2_hits + self.l2_misses
+        return {
+            "l1"        : self.local.stats(),
+            "l2"        : {
+                "hits"     : self.l2_hits,
+                "misses"   : self.l2_misses,
+                "hit_rate" : round(self.l2_hits / l2_total, 4) if l2_total else 0.0
+            },
+            "computes"  : self.computes,
+            "refreshes" : self.refreshes,
+            "inflight"  : len(self.inflight)
+        }
+
 
 if __name__ == '__main__':
     pass
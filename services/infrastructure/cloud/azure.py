@@ -8,13 +8,16 @@
 import httpx
 import hashlib
 from loguru import logger
-from fastapi import Request
+from fastapi import (
+    Request, Response
+)
 from schemas.cognitive import (
-    LicenseResponse, SpeechRequest, Mix, SpeechResponse
+    SpeechRequest, SpeechResponse
 )
 from services.domain.standard import signature
+from services.infrastructure.cache.mix_snapshot import MixSnapshot
 from services.infrastructure.cache.upstash import UpStash
-from services.infrastructure.storage.r2_storage import R2Storage
+from services.infrastructure.storage.r2_storage import AsyncR2Storage
 from utils import (
     const, toolset
 )
@@ -38,13 +41,12 @@ class Azure(object):
         }
 
     @staticmethod
-    async def tts_meta(request: Request, a: str, t: int, n: str) -> LicenseResponse:
+    async def tts_meta(request: Request, a: str, t: int, n: str) -> Response:
         app_name, app_desc, *_ = a.lower().strip(), a, t, n
 
-        cache: UpStash = request.app.state.cache
+        snapshot: MixSnapshot = request.app.state.snapshot
 
-        if mixed := await cache.get(const.K_MIX): mix = Mix(**mixed)
-        else: mix = Mix(**const.V_MIX)
+        mix = snapshot.bind(request)
 
         cur = mix.app.get("Azure", {}).get("tts_engine", {}).get("enabled", False)
         logger.info(f"远程语音服务状态 -> {cur}")
@@ -53,10 +55,9 @@ class Azure(object):
             "mode": {"enabled": cur, "formats": ["mp3"]}
         }
 
-        signed_data = signature.signature_license(
-            license_info, private_key=f"{app_name}_{const.BASE_PRIVATE_KEY}"
+        return await signature.license_response(
+            request, license_info, private_key=f"{app_name}_{const.BASE_PRIVATE_KEY}"
         )
-        return LicenseResponse(**signed_data)
 
     async def tts_audio(self, req: SpeechRequest, request: Request) -> SpeechResponse:
         logger.info(f"{req.voice} -> {req.speak}")
@@ -65,15 +66,15 @@ class Azure(object):
             f"{req.voice}|{req.speak}".encode(const.CHARSET)
         ).hexdigest()
 
-        cache: UpStash = request.app.state.cache
-        r2: R2Storage  = request.app.state.r2
+        cache: UpStash     = request.app.state.cache
+        r2: AsyncR2Storage = request.app.state.r2
 
         # 👉 优先读取 Redis（只存储对象 Key）
         if cached := await cache.get(cache_key):
             r2_key   = cached["key"]
             filename = f"speech.{req.waver}"
 
-            signed_url = r2.signed_url_for_stream(
+            signed_url = await r2.signed_url_for_stream(
                 key=r2_key, expires_in=3600, disposition_filename=filename
             )
             logger.info(f"下发缓存签名 URL -> {signed_url}")
@@ -84,11 +85,11 @@ class Azure(object):
         filename = f"speech.{req.waver}"
 
         # 👉 如果 Cloudflare R2 已存在，生成签名 URL
-        if r2.file_exists(r2_key):
-            await cache.set(cache_key, {"key": r2_key}, ex=86400)
+        if await r2.file_exists(r2_key):
+            await cache.set(cache_key, {"key": r2_key}, ex=cache.jitter(86400))
             logger.info(f"Redis cache -> {r2_key}")
 
-            signed_url = r2.signed_url_for_stream(
+            signed_url = await r2.signed_url_for_stream(
                 key=r2_key, expires_in=3600, disposition_filename=filename
             )
             logger.info(f"下发 R2 签名 URL -> {signed_url}")
@@ -145,7 +146,7 @@ class Azure(object):
             media_type  = cfg["mime"]
 
             # 👉 上传至 Cloudflare R2
-            r2.upload_file(
+            await r2.upload_file(
                 key=r2_key,
                 content=audio_bytes,
                 content_type=media_type,
@@ -153,11 +154,11 @@ class Azure(object):
             )
 
             # 👉 写入 Redis 缓存（只存 Key）
-            await cache.set(cache_key, {"key": r2_key}, ex=86400)
+            await cache.set(cache_key, {"key": r2_key}, ex=cache.jitter(86400))
             logger.info(f"Redis cache -> {r2_key}")
 
             # 👉 生成签名 URL（每次请求都重新生成）
-            signed_url = r2.signed_url_for_stream(
+            signed_url = await r2.signed_url_for_stream(
                 key=r2_key, expires_in=3600, disposition_filename=filename
             )
 
@@ -0,0 +1,220 @@
+#  ____  _
+# / ___|(_) __ _ _ __   ___ _ __
+# \___ \| |/ _` | '_ \ / _ \ '__|
+#  ___) | | (_| | | | |  __/ |
+# |____/|_|\__, |_| |_|\___|_|
+#          |___/
+#
+
+import time
+import typing
+import asyncio
+import multiprocessing
+from loguru import logger
+from concurrent.futures import ProcessPoolExecutor
+from cryptography.hazmat.primitives import hashes
+from cryptography.hazmat.primitives.asymmetric import (
+    ec, ed25519, padding, rsa, utils
+)
+from utils import const
+from utils.keyring import KeyRing
+
+# 签名子进程内的私钥环，由 `init_worker` 创建
+_worker_ring: typing.Optional[KeyRing] = None
+
+
+def init_worker() -> None:
+    """签名子进程初始化：按路径加载私钥，私钥对象不跨进程传递。"""
+
+    global _worker_ring
+    _worker_ring = KeyRing()
+    _worker_ring.preload()
+
+
+def sign_with(private_key: typing.Any, message: bytes) -> bytes:
+    if isinstance(private_key, ed25519.Ed25519PrivateKey):
+        return private_key.sign(message)
+    if isinstance(private_key, ec.EllipticCurvePrivateKey):
+        # JOSE ES256 要求定长 r||s，cryptography 输出的是 DER
+        r, s = utils.decode_dss_signature(private_key.sign(message, ec.ECDSA(hashes.SHA256())))
+        size = (private_key.curve.key_size + 7) // 8
+        return r.to_bytes(size, "big") + s.to_bytes(size, "big")
+    if isinstance(private_key, rsa.RSAPrivateKey):
+        return private_key.sign(message, padding.PKCS1v15(), hashes.SHA256())
+
+    raise TypeError(f"unsupported key type: {type(private_key).__name__}")
+
+
+def run_batch(jobs: list[tuple[str, str, bytes]]) -> list[typing.Union[bytes, Exception]]:
+    """
+    子进程内执行一批签名。
+
+    每个任务附带主进程看到的 kid；子进程私钥环尚未感知轮换时立即重新加载，
+    保证签名所用私钥与签名缓存 key 中的 kid 一致。
+    """
+    results = []
+    for key_file, kid, message in jobs:
+        try:
+            slot = _worker_ring.slot(key_file)
+            if slot.kid != kid:
+                _worker_ring.load(slot, time.monotonic())
+            if slot.kid != kid:
+                raise LookupError(f"kid mismatch {key_file}: {slot.kid} != {kid}")
+            results.append(sign_with(slot.key, message))
+        except Exception as e:
+            results.append(e)
+    return results
+
+
+class SignJob(object):
+    """
+    一次待签名请求。
+
+    key_file : 私钥文件名，交给 `KeyRing` 解析
+    message  : 待签名的规范 JSON 字节
+    """
+
+    __slots__ = ("key_file", "message", "future", "enqueued_at")
+
+    def __init__(self, key_file: str, message: bytes, future: asyncio.Future):
+        self.key_file: str = key_file
+        self.message: bytes = message
+        self.future: asyncio.Future = future
+        self.enqueued_at: float = time.perf_counter()
+
+
+class Signer(object):
+    """
+    事件循环外的签名服务。
+
+    - 签名在独立进程池中执行：cryptography 的 RSA 签名不释放 GIL，线程池既不能并行，也会拖慢事件循环
+    - 子进程通过 `init_worker` 自建私钥环，按私钥文件名加载，只传递文件名、kid 与待签名字节
+    - 同一轮事件循环内到达的签名请求合并为一次进程池调度，每批最多 `batch_size` 个
+    - ECDSA 签名按 JOSE ES256 输出定长 r||s（P-256 为 64 字节），而非 DER
+    - 记录排队深度、批次数与端到端耗时（排队 + 签名），超过 `const.SIGN_SLOW_MS` 时告警
+    """
+
+    def __init__(
+        self,
+        key_ring: KeyRing,
+        workers: int = const.SIGN_WORKERS,
+        batch_size: int = const.SIGN_BATCH_SIZE
+    ):
+        self.key_ring: KeyRing = key_ring
+        self.workers: int = workers
+        self.batch_size: int = batch_size
+
+        # spawn：主进程已有事件循环与线程，fork 不安全
+        self.executor: ProcessPoolExecutor = ProcessPoolExecutor(
+            max_workers=workers, mp_context=multiprocessing.get_context("spawn"), initializer=init_worker
+        )
+        self.queue: list[SignJob] = []
+        self.scheduled: bool = False
+        self.tasks: set[asyncio.Task] = set()
+
+        self.depth: int = 0
+        self.signed: int = 0
+        self.batches: int = 0
+        self.latency_ms: float = 0.0
+        self.latency_max_ms: float = 0.0
+
+    def __str__(self) -> str:
+        return f"<Signer workers={self.workers} depth={self.depth} signed={self.signed}>"
+
+    __repr__ = __str__
+
+    async def start(self) -> None:
+        """预先拉起全部签名子进程并加载私钥，首个请求不承担进程启动耗时。"""
+
+        loop = asyncio.get_running_loop()
+        await asyncio.gather(
+            *(loop.run_in_executor(self.executor, time.sleep, 0.05) for _ in range(self.workers))
+        )
+        logger.info(f"签名进程池已就绪 -> workers={self.workers}")
+
+    async def sign(self, key_file: str, message: bytes) -> bytes:
+        return (await self.sign_many([(key_file, message)]))[0]
+
+    async def sign_many(self, items: list[tuple[str, bytes]]) -> list[bytes]:
+        """
+        批量签名。
+
+        Parameters
+        ----------
+        items : list[tuple[str, bytes]]
+            (私钥文件名, 待签名字节) 列表
+
+        Returns
+        -------
+        list[bytes]
+            与 `items` 顺序一致的签名结果
+        """
+        if not items:
+            return []
+
+        loop = asyncio.get_running_loop()
+        jobs = [SignJob(key_file, message, loop.create_future()) for key_file, message in items]
+
+        self.queue.extend(jobs)
+        self.depth += len(jobs)
+
+        if not self.scheduled:
+            self.scheduled = True
+            loop.call_soon(self.flush)
+
+        return list(await asyncio.gather(*(job.future for job in jobs)))
+
+    def flush(self) -> None:
+        self.scheduled = False
+
+        queue, self.queue = self.queue, []
+        for i in range(0, len(queue), self.batch_size):
+            task = asyncio.create_task(self.dispatch(queue[i:i + self.batch_size]))
+            self.tasks.add(task)
+            task.add_done_callback(self.tasks.discard)
+
+    async def dispatch(self, batch: list[SignJob]) -> None:
+        loop = asyncio.get_running_loop()
+        self.batches += 1
+
+        try:
+            jobs    = [(job.key_file, self.key_ring.kid(job.key_file), job.message) for job in batch]
+            results = await loop.run_in_executor(self.executor, run_batch, jobs)
+        except Exception as e:
+            results = [e] * len(batch)
+
+        now = time.perf_counter()
+        for job, result in zip(batch, results):
+            self.depth  -= 1
+            self.signed += 1
+
+            cost = (now - job.enqueued_at) * 1000
+            self.latency_ms     = cost if self.signed == 1 else self.latency_ms * 0.9 + cost * 0.1
+            self.latency_max_ms = max(self.latency_max_ms, cost)
+            if cost > const.SIGN_SLOW_MS:
+                logger.warning(f"签名耗时 {cost:.2f}ms depth={self.depth} batch={len(batch)}")
+
+            if job.future.done():
+                continue
+            if isinstance(result, Exception):
+                job.future.set_exception(result)
+            else:
+                job.future.set_result(result)
+
+    def stats(self) -> dict:
+        return {
+            "depth"          : self.depth,
+            "signed"         : self.signed,
+            "batches"        : self.batches,
+            "latency_ms"     : round(self.latency_ms, 2),
+            "latency_max_ms" : round(self.latency_max_ms, 2)
+        }
+
+    async def stop(self) -> None:
+        await asyncio.gather(*self.tasks, return_exceptions=True)
+        self.executor.shutdown(wait=True)
+        logger.info(f"签名服务已停止 -> {self.stats()}")
+
+
+if __name__ == '__main__':
+    pass
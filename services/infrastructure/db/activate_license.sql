@@ -0,0 +1,154 @@
+-- ============================================================
+-- activate_license
+--
+-- 单次往返完成通行证校验与激活状态迁移（compare-and-swap）。
+--
+-- 返回 jsonb:
+--   {"status": "<status>", "code": <license_codes 行 | null>, "previous": <迁移前的行>}
+--   invalid / conflict 时 code 为 null，其余状态返回当前行（供行缓存回写）
+--   previous 仅在 issued / reissued 时返回，签名失败时交给 release_license 回滚
+--
+-- status:
+--   issued     新设备激活成功
+--   reissued   同设备重复激活（issued_at / license_id 保持不变）
+--   invalid    通行证不存在
+--   revoked    通行证已吊销
+--   expired    通行证已过期
+--   replay     nonce 与上次相同
+--   exhausted  超过最大激活次数
+--   conflict   并发激活导致 CAS 失败，客户端可重试
+--
+-- license_id 与 Supabase.generate_license_id 保持一致：
+--   sha256("{app}:{code}:{issued}")
+-- ============================================================
+
+create or replace function public.activate_license(
+    p_app        text,
+    p_code       text,
+    p_castle     text,
+    p_license_id text,
+    p_nonce      text,
+    p_issued     text
+)
+returns jsonb
+language plpgsql
+security definer
+set search_path = public
+as $$
+declare
+    v_row  license_codes%rowtype;
+    v_new  license_codes%rowtype;
+    v_same boolean;
+begin
+    select * into v_row
+      from license_codes
+     where app = p_app and code = p_code;
+
+    if not found then
+        return jsonb_build_object('status', 'invalid', 'code', null);
+    end if;
+
+    if v_row.is_revoked then
+        return jsonb_build_object('status', 'revoked', 'code', to_jsonb(v_row));
+    end if;
+
+    if (now() at time zone 'utc')::date > v_row.expire::date then
+        return jsonb_build_object('status', 'expired', 'code', to_jsonb(v_row));
+    end if;
+
+    if p_nonce = v_row.last_nonce then
+        return jsonb_build_object('status', 'replay', 'code', to_jsonb(v_row));
+    end if;
+
+    v_same := v_row.is_used
+              and v_row.castle = p_castle
+              and v_row.license_id is not distinct from p_license_id;
+
+    if not v_same and v_row.activations >= v_row.max_activations then
+        return jsonb_build_object('status', 'exhausted', 'code', to_jsonb(v_row));
+    end if;
+
+    -- CAS：只有在读取之后 activations / last_nonce / license_id 均未被修改时才提交
+    update license_codes
+       set issued      = p_issued::timestamptz,
+           last_nonce  = p_nonce,
+           castle      = case when v_same then castle else p_castle end,
+           is_used     = true,
+           activations = case when v_same then activations else activations + 1 end,
+           issued_at   = case when v_same then issued_at else p_issued::timestamptz end,
+           license_id  = case
+                             when v_same then license_id
+                             else encode(sha256(convert_to(p_app || ':' || p_code || ':' || p_issued, 'UTF8')), 'hex')
+                         end
+     where app = p_app
+       and code = p_code
+       and activations = v_row.activations
+       and last_nonce  is not distinct from v_row.last_nonce
+       and license_id  is not distinct from v_row.license_id
+    returning * into v_new;
+
+    if not found then
+        return jsonb_build_object('status', 'conflict', 'code', null);
+    end if;
+
+    return jsonb_build_object(
+        'status',   case when v_same then 'reissued' else 'issued' end,
+        'code',     to_jsonb(v_new),
+        'previous', to_jsonb(v_row)
+    );
+end;
+$$;
+
+revoke all on function public.activate_license(text, text, text, text, text, text) from public, anon;
+grant execute on function public.activate_license(text, text, text, text, text, text) to service_role;
+
+
+-- ============================================================
+-- release_license
+--
+-- activate_license 的补偿操作：激活已提交但 License 未能下发（如签名失败）时，
+-- 把行恢复为迁移前的状态，避免客户端重试时再消耗一次激活次数。
+--
+-- 仅当 last_nonce 仍为本次请求的 nonce 时才回滚，之后已有新的激活则放弃。
+--
+-- 返回 jsonb:
+--   {"status": "released" | "stale", "code": <license_codes 行 | null>}
+-- ============================================================
+
+create or replace function public.release_license(
+    p_app      text,
+    p_code     text,
+    p_nonce    text,
+    p_previous jsonb
+)
+returns jsonb
+language plpgsql
+security definer
+set search_path = public
+as $$
+declare
+    v_row license_codes%rowtype;
+begin
+    update license_codes
+       set issued      = (p_previous->>'issued')::timestamptz,
+           last_nonce  = p_previous->>'last_nonce',
+           castle      = p_previous->>'castle',
+           is_used     = (p_previous->>'is_used')::boolean,
+           activations = (p_previous->>'activations')::integer,
+           issued_at   = (p_previous->>'issued_at')::timestamptz,
+           license_id  = p_previous->>'license_id'
+     where app = p_app
+       and code = p_code
+       and last_nonce = p_nonce
+    returning * into v_row;
+
+    if not found then
+        return jsonb_build_object('status', 'stale', 'code', null);
+    end if;
+
+    return jsonb_build_object('status', 'released', 'code', to_jsonb(v_row));
+end;
+$$;
+
+revoke all on function public.release_license(text, text, text, jsonb) from public, anon;
+grant execute on function public.release_license(text, text, text, jsonb) to service_role;
@@ -6,12 +6,21 @@
 #              |_|
 #
 
+import json
+import time
 import httpx
 import typing
 import string
+import asyncio
 import hashlib
 import secrets
+import argparse
+from pathlib import Path
 from loguru import logger
+from datetime import (
+    datetime, timezone
+)
+from services.infrastructure.cache.upstash import UpStash
 from utils import (
     const, toolset
 )
@@ -23,81 +32,341 @@ env = toolset.current_env(
 supabase_url = env[const.SUPABASE_URL]
 supabase_key = env[const.SUPABASE_KEY]
 
+CODE_CHARS = string.ascii_uppercase + string.digits
+
+_random = secrets.SystemRandom()
+
 
 class Supabase(object):
+    """
+    Supabase REST 客户端。
+
+    应用生命周期内共享一个 `httpx.AsyncClient`（HTTP/2 + 有界连接池），
+    授权流程中的多次调用复用同一条 TLS 连接，不阻塞事件循环。
 
-    def __init__(self):
+    传入 `cache` 时启用通行证行缓存：
+    - 按 (app, code) 缓存行数据 `const.LICENSE_ROW_TTL` 秒，不存在的 code 负缓存 `const.LICENSE_DENY_TTL` 秒
+    - `activate_license` 先用缓存行做确定性拒绝（吊销 / 过期 / 重放 / 超限），命中即不访问数据库
+    - 所有写路径（RPC 结果、`release_license`、`update_activation_status`）同步回写或失效缓存
+    """
+
+    def __init__(self, cache: typing.Optional[UpStash] = None):
+        self.cache = cache
         self.url = f"{supabase_url}/rest/v1/{const.LICENSE_CODES}"
+        self.rpc = f"{supabase_url}/rest/v1/rpc"
         self.headers = {
             "apikey"        : supabase_key,
             "Authorization" : f"Bearer {supabase_key}"
         }
         self.timeout = 10.0
 
-    def fetch_activation_code(self, app: str, code: str) -> typing.Optional[dict]:
-        params   = {"app": f"eq.{app}", "code": f"eq.{code}"}
-        response = httpx.get(
-            self.url, headers=self.headers, params=params, timeout=self.timeout
+        self.client = httpx.AsyncClient(
+            headers=self.headers,
+            timeout=self.timeout,
+            http2=True,
+            limits=httpx.Limits(**const.SUPABASE_POOL)
         )
-        response.raise_for_status()
-        return data[0] if (data := response.json()) else None
 
-    def update_activation_status(self, app: str, code: str, json: dict, *_, **__) -> typing.Optional[bool]:
+    @staticmethod
+    def row_key(app: str, code: str) -> str:
+        return f"{app}:License:{hashlib.sha256(code.encode(const.CHARSET)).hexdigest()[:32]}"
+
+    async def cached_row(self, app: str, code: str) -> typing.Optional[dict]:
+        if self.cache is None:
+            return None
+        try:
+            return await self.cache.get(self.row_key(app, code))
+        except Exception as e:
+            return logger.warning(f"通行证缓存读取失败: {e}")
+
+    async def cache_row(self, app: str, code: str, row: typing.Optional[dict], ex: int = const.LICENSE_ROW_TTL) -> None:
+        if self.cache is None:
+            return None
+        try:
+            if row is None:
+                await self.cache.delete(self.row_key(app, code))
+            else:
+                await self.cache.set(self.row_key(app, code), row, ex=ex)
+        except Exception as e:
+            logger.warning(f"通行证缓存写入失败: {e}")
+
+    @staticmethod
+    def deny_reason(row: dict, castle: str, license_id: typing.Optional[str], nonce: str) -> typing.Optional[str]:
+        """按缓存行复现 activate_license 的确定性拒绝判断，无法确定时返回 None。"""
+
+        if denied := row.get("denied"):
+            return denied
+        if row["is_revoked"]:
+            return "revoked"
+        if datetime.now(timezone.utc).date() > datetime.fromisoformat(row["expire"]).date():
+            return "expired"
+        if nonce == row["last_nonce"]:
+            return "replay"
+
+        same = row["is_used"] and row["castle"] == castle and row["license_id"] == license_id
+        if not same and row["activations"] >= row["max_activations"]:
+            return "exhausted"
+        return None
+
+    async def fetch_activation_code(self, app: str, code: str) -> typing.Optional[dict]:
+        if (row := await self.cached_row(app, code)) is not None:
+            return None if row.get("denied") else row
+
         params   = {"app": f"eq.{app}", "code": f"eq.{code}"}
-        response = httpx.patch(
-            self.url, headers=self.headers, params=params, json=json, timeout=self.timeout
-        )
+        response = await self.client.get(self.url, params=params)
         response.raise_for_status()
-        return response.status_code == 204
 
-    def mark_code_pending(self, app: str, code: str) -> bool:
-        json    = {"pending": True}
-        params  = {"app": f"eq.{app}", "code": f"eq.{code}"}
-        headers = self.headers.copy() | {"Prefer": "return=minimal"}
+        if data := response.json():
+            await self.cache_row(app, code, data[0])
+            return data[0]
 
-        response = httpx.patch(
-            self.url, headers=headers, params=params, json=json, timeout=self.timeout
-        )
+        await self.cache_row(app, code, {"denied": "invalid"}, ex=const.LICENSE_DENY_TTL)
+        return None
+
+    async def update_activation_status(self, app: str, code: str, json: dict, *_, **__) -> typing.Optional[bool]:
+        params   = {"app": f"eq.{app}", "code": f"eq.{code}"}
+        response = await self.client.patch(self.url, params=params, json=json)
         response.raise_for_status()
+        await self.cache_row(app, code, None)
         return response.status_code == 204
 
-    def wash_code_pending(self, app: str, code: str) -> bool:
-        json    = {"pending": False}
-        params  = {"app": f"eq.{app}", "code": f"eq.{code}"}
-        headers = self.headers.copy() | {"Prefer": "return=minimal"}
+    async def activate_license(
+        self, app: str, code: str, castle: str, license_id: typing.Optional[str], nonce: str, issued: str
+    ) -> dict:
+        """
+        调用 Postgres RPC `activate_license`（见 activate_license.sql），单次往返完成校验与激活。
 
-        response = httpx.patch(
-            self.url, headers=headers, params=params, json=json, timeout=self.timeout
-        )
+        缓存行足以判定拒绝时直接返回 {"status": <拒绝原因>, "code": <缓存行>}，不访问数据库。
+
+        Returns
+        -------
+        dict
+            {"status": str, "code": dict | None, "previous": dict（仅 issued / reissued）}
+        """
+        if (row := await self.cached_row(app, code)) is not None:
+            if reason := self.deny_reason(row, castle, license_id, nonce):
+                logger.info(f"通行证缓存拒绝 -> {reason}")
+                return {"status": reason, "code": None if row.get("denied") else row}
+
+        json = {
+            "p_app"        : app,
+            "p_code"       : code,
+            "p_castle"     : castle,
+            "p_license_id" : license_id,
+            "p_nonce"      : nonce,
+            "p_issued"     : issued
+        }
+        response = await self.client.post(f"{self.rpc}/{const.ACTIVATE_LICENSE}", json=json)
         response.raise_for_status()
-        return response.status_code == 204
+
+        result = response.json()
+        match result["status"]:
+            case "invalid":
+                await self.cache_row(app, code, {"denied": "invalid"}, ex=const.LICENSE_DENY_TTL)
+            case "conflict":
+                await self.cache_row(app, code, None)
+            case _:
+                await self.cache_row(app, code, result["code"])
+
+        return result
+
+    async def release_license(self, app: str, code: str, nonce: str, previous: dict) -> bool:
+        """
+        调用 Postgres RPC `release_license`，把 `activate_license` 已提交的迁移回滚为 `previous`。
+
+        仅当 last_nonce 仍为 `nonce` 时生效；无论成功与否都失效行缓存。
+        """
+        json = {
+            "p_app"      : app,
+            "p_code"     : code,
+            "p_nonce"    : nonce,
+            "p_previous" : previous
+        }
+        try:
+            response = await self.client.post(f"{self.rpc}/{const.RELEASE_LICENSE}", json=json)
+            response.raise_for_status()
+        finally:
+            await self.cache_row(app, code, None)
+
+        return response.json()["status"] == "released"
+
+    async def stop(self) -> None:
+        await self.client.aclose()
 
     @staticmethod
     def generate_license_id(app: str, code: str, issued_at: str) -> str:
         raw = f"{app}:{code}:{issued_at}".encode(const.CHARSET)
         return hashlib.sha256(raw).hexdigest()
 
-    def generate_and_upload(self, app: str, count: int, expire: str) -> None:
+    @staticmethod
+    def secure_code(app: str) -> str:
+        core = "".join(_random.choices(CODE_CHARS, k=36))
+        return f"{app}-Key-{core[:8]}-{core[8:16]}-{core[16:]}"
+
+    async def existing_codes(self, codes: list[str]) -> set[str]:
+        """按 code 查询已存在的行，每次查询 `const.CODE_LOOKUP_SIZE` 个，避免 URL 过长。"""
+
+        found = set()
+        for i in range(0, len(codes), const.CODE_LOOKUP_SIZE):
+            params   = {"select": "code", "code": f"in.({','.join(codes[i:i + const.CODE_LOOKUP_SIZE])})"}
+            response = await self.client.get(self.url, params=params, timeout=60)
+            response.raise_for_status()
+            found |= {row["code"] for row in response.json()}
+
+        return found
+
+    async def insert_codes(self, rows: list[dict], known: bool = False) -> set[str]:
+        """
+        批量插入通行证（单次数组 POST），已存在的 code 被忽略。
 
-        def secure_code() -> str:
-            chars = string.ascii_uppercase + string.digits
-            core  = "".join(secrets.choice(chars) for _ in range(36))
-            return f"{app}-Key-{core[:8]}-{core[8:16]}-{core[16:]}"
+        - 响应丢失或 5xx 时上一次 POST 可能已经提交，重试前先按 code 查询，已存在的视为本批写入，只重发其余行
+        - `known=True`（断点续传的在途批次）时第一次提交前也先查询
+        - code 为 36 位随机串，与他人 code 真正碰撞的概率可忽略，查询到的已存在 code 即为本批写入
 
-        def upload_code(code: str) -> None:
-            json = {
-                "app": app, "code": code, "expire": expire, "is_used": False
-            }
+        Returns
+        -------
+        set[str]
+            本批已写入的 code 集合；与提交集合的差即为碰撞
+        """
+        headers = {"Prefer": "resolution=ignore-duplicates,return=representation"}
+        params  = {"on_conflict": "code", "select": "code"}
+        retries = max(1, const.CODE_RETRIES)
+
+        inserted, pending = set(), rows
+        for attempt in range(1, retries + 1):
             try:
-                response = httpx.post(self.url, headers=self.headers, json=json)
+                if known:
+                    inserted |= await self.existing_codes([row["code"] for row in pending])
+                    if not (pending := [row for row in pending if row["code"] not in inserted]):
+                        return inserted
+
+                response = await self.client.post(
+                    self.url, headers=headers, params=params, json=pending, timeout=60
+                )
                 response.raise_for_status()
-            except httpx.HTTPStatusError as e:
-                logger.error(f"❌ 插入失败: {code} -> {e.response.status_code}: {e.response.text}")
-            else:
-                logger.info(f"✅ 成功插入: {code}")
+                return inserted | {row["code"] for row in response.json()}
+            except (httpx.TransportError, httpx.HTTPStatusError) as e:
+                if isinstance(e, httpx.HTTPStatusError) and e.response.status_code < 500:
+                    raise
+                if attempt == retries:
+                    raise
+                logger.warning(f"批量插入失败，第 {attempt} 次重试: {e}")
+                known = True
+                await asyncio.sleep(2 ** attempt)
+
+    async def generate_and_upload(
+        self,
+        app: str,
+        count: int,
+        expire: str,
+        batch_size: int = const.CODE_BATCH_SIZE,
+        concurrency: int = const.CODE_CONCURRENCY,
+        checkpoint: typing.Optional[str] = None
+    ) -> dict:
+        """
+        批量生成并上传通行证。
+
+        - 每批 `batch_size` 个 code 作为一次数组 POST，`concurrency` 个批次并发
+        - 碰撞的 code 会被数据库忽略，缺口在同一批次内重新生成补齐
+        - 指定 `checkpoint` 时记录已完成数量与在途批次的具体 code，中断后以相同参数重跑即可续传；
+          在途批次按原 code 续传，已写入的部分不会重复生成
+
+        Returns
+        -------
+        dict
+            吞吐统计
+        """
+        state = {"app": app, "expire": expire, "count": count, "done": 0, "pending": {}}
+        if checkpoint and (path := Path(checkpoint)).exists():
+            saved = json.loads(path.read_text(encoding=const.CHARSET))
+            if (saved["app"], saved["expire"], saved["count"]) == (app, expire, count):
+                state = {**state, **saved}
+                logger.info(f"从断点续传 -> {state['done']}/{count} 在途批次 {len(state['pending'])}")
+
+        def save() -> None:
+            if checkpoint:
+                (tmp := Path(f"{checkpoint}.tmp")).write_text(json.dumps(state), encoding=const.CHARSET)
+                tmp.replace(checkpoint)
 
-        for _ in range(count): upload_code(secure_code())
+        stats = {"inserted": 0, "collisions": 0, "batches": 0}
+        gate  = asyncio.Semaphore(concurrency)
+        start = time.perf_counter()
+
+        def row(code: str) -> dict:
+            return {"app": app, "code": code, "expire": expire, "is_used": False}
+
+        async def upload_batch(batch: str, codes: list[str], known: bool) -> None:
+            async with gate:
+                size      = len(codes)
+                confirmed = set()
+                state["pending"][batch] = codes
+                save()
+
+                while len(confirmed) < size:
+                    todo     = [code for code in codes if code not in confirmed]
+                    inserted = await self.insert_codes([row(code) for code in todo], known=known)
+                    stats["collisions"] += len(todo) - len(inserted)
+                    stats["inserted"]   += len(inserted)
+                    confirmed |= inserted
+
+                    if len(confirmed) < size:
+                        codes = [*confirmed, *(self.secure_code(app) for _ in range(size - len(confirmed)))]
+                        state["pending"][batch] = codes
+                        save()
+                    known = False
+
+                del state["pending"][batch]
+                stats["batches"] += 1
+                state["done"]    += size
+                save()
+
+                elapsed = time.perf_counter() - start
+                logger.info(
+                    f"✅ {state['done']}/{count} | {stats['inserted'] / elapsed:.0f} codes/s | 碰撞 {stats['collisions']}"
+                )
+
+        resumed = list(state["pending"].items())
+        remaining = count - state["done"] - sum(len(codes) for _, codes in resumed)
+        fresh     = [
+            [self.secure_code(app) for _ in range(min(batch_size, remaining - i))]
+            for i in range(0, remaining, batch_size)
+        ]
+        await asyncio.gather(
+            *(upload_batch(batch, codes, True) for batch, codes in resumed),
+            *(upload_batch(codes[0], codes, False) for codes in fresh)
+        )
+
+        elapsed = time.perf_counter() - start
+        stats.update({
+            "elapsed"    : round(elapsed, 2),
+            "throughput" : round(stats["inserted"] / elapsed, 2) if elapsed else 0.0
+        })
+        logger.success(f"通行证生成完成 -> {app} {stats}")
+
+        if checkpoint:
+            Path(checkpoint).unlink(missing_ok=True)
+
+        return stats
+
+
+async def main() -> None:
+    parser = argparse.ArgumentParser(description="批量生成并上传通行证")
+    parser.add_argument("--app", required=True, help="应用名称，例如 Framix")
+    parser.add_argument("--count", required=True, type=int, help="生成数量")
+    parser.add_argument("--expire", required=True, help="过期日期，例如 2026-12-31")
+    parser.add_argument("--batch-size", type=int, default=const.CODE_BATCH_SIZE, help="每批数量")
+    parser.add_argument("--concurrency", type=int, default=const.CODE_CONCURRENCY, help="并发批次数")
+    parser.add_argument("--checkpoint", default=None, help="断点文件路径")
+    args = parser.parse_args()
+
+    supabase = Supabase()
+    try:
+        await supabase.generate_and_upload(
+            args.app, args.count, args.expire, args.batch_size, args.concurrency, args.checkpoint
+        )
+    finally:
+        await supabase.stop()
 
 
 if __name__ == "__main__":
-    pass
+    asyncio.run(main())
@@ -0,0 +1,119 @@
+#   ____ _                 _      __  __             _  __           _
+#  / ___| |__  _   _ _ __ | | __ |  \/  | __ _ _ __ (_)/ _| ___  ___| |_
+# | |   | '_ \| | | | '_ \| |/ / | |\/| |/ _` | '_ \| | |_ / _ \/ __| __|
+# | |___| | | | |_| | | | |   <  | |  | | (_| | | | | |  _|  __/\__ \ |_
+#  \____|_| |_|\__,_|_| |_|_|\_\ |_|  |_|\__,_|_| |_|_|_|  \___||___/\__|
+#
+
+import json
+import typing
+import hashlib
+from pathlib import Path
+from loguru import logger
+from utils import const
+from utils.chunker import GearChunker
+
+
+class ChunkManifest(object):
+    """
+    R2 产物的内容定义分块清单。
+
+    - 数据经 `GearChunker` 内容定义分块，记录每块的 SHA-256、偏移与大小
+    - 块本身不单独上传：存储桶私有，客户端只能拿到产物与清单的下载 URL
+    - `finish` 上传分块清单 `{prefix}/{文件哈希}.json`，返回可写入签名元信息的清单引用
+
+    清单结构:
+
+        {
+            "algorithm": "gear32", "min": ..., "avg": ..., "max": ...,
+            "size": 文件大小, "hash": 文件 SHA-256, "key": 产物对象 Key,
+            "chunks": [[块哈希, 偏移, 大小], ...]
+        }
+
+    客户端对本地旧文件按同一规则分块（或保留旧清单），哈希不在本地的块
+    按偏移对产物下载 URL 发 Range 请求获取，再按清单顺序拼回完整文件。
+    """
+
+    def __init__(
+        self,
+        client: typing.Any,
+        key: str,
+        bucket: str = const.BUCKET,
+        prefix: str = const.CHUNK_MANIFEST
+    ):
+        self.client: typing.Any = client
+        self.key: str = key
+        self.bucket: str = bucket
+        self.prefix: str = prefix.rstrip("/")
+
+        self.chunker: GearChunker = GearChunker()
+        self.buffer: bytearray = bytearray()
+        self.sha256 = hashlib.sha256()
+        self.size: int = 0
+        self.chunks: list[list] = []
+
+    def __str__(self) -> str:
+        return f"<ChunkManifest {self.bucket}/{self.key} chunks={len(self.chunks)}>"
+
+    __repr__ = __str__
+
+    def add(self, body: bytes) -> None:
+        self.chunks.append([hashlib.sha256(body).hexdigest(), self.size, len(body)])
+        self.size += len(body)
+
+    def feed(self, data: typing.Union[bytes, bytearray, memoryview]) -> None:
+        # 小块写入（如 zipfile 输出）先攒成 `const.CDC_SEGMENT` 再分块，分块结果与写入粒度无关
+        self.sha256.update(data)
+        self.buffer += data
+
+        if len(self.buffer) >= const.CDC_SEGMENT:
+            self.flush()
+
+    def flush(self) -> None:
+        segment, self.buffer = self.buffer, bytearray()
+        for body in self.chunker.feed(segment):
+            self.add(body)
+
+    def finish(self) -> dict:
+        """
+        上传分块清单。
+
+        Returns
+        -------
+        dict
+            {"key": 清单对象 Key, "hash": 清单 SHA-256, "chunks": 块数}
+        """
+        self.flush()
+        for body in self.chunker.finish():
+            self.add(body)
+
+        file_hash = self.sha256.hexdigest()
+        manifest  = {
+            **self.chunker.params(),
+            "size"   : self.size,
+            "hash"   : file_hash,
+            "key"    : self.key,
+            "chunks" : self.chunks
+        }
+        body = json.dumps(manifest, separators=(",", ":")).encode(const.CHARSET)
+        key  = f"{self.prefix}/{file_hash}.json"
+
+        self.client.put_object(
+            Bucket=self.bucket, Key=key, Body=body, ContentType="application/json"
+        )
+        logger.success(f"分块清单已发布 -> {key} 共 {len(self.chunks)} 块")
+
+        return {"key": key, "hash": hashlib.sha256(body).hexdigest(), "chunks": len(self.chunks)}
+
+    def publish(self, file_path: typing.Union[str, Path]) -> dict:
+        """
+        为已上传到 `key` 的本地文件生成并发布分块清单，返回清单引用（同 `finish`）。
+        """
+        with Path(file_path).open("rb") as f:
+            while segment := f.read(const.CDC_SEGMENT):
+                self.feed(segment)
+        return self.finish()
+
+
+if __name__ == '__main__':
+    pass
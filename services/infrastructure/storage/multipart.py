@@ -0,0 +1,158 @@
+#  __  __       _ _   _                  _
+# |  \/  |_   _| | |_(_)_ __   __ _ _ __| |_
+# | |\/| | | | | | __| | '_ \ / _` | '__| __|
+# | |  | | |_| | | |_| | |_) | (_| | |  | |_
+# |_|  |_|\__,_|_|\__|_| .__/ \__,_|_|   \__|
+#                      |_|
+#
+
+import io
+import time
+import typing
+import hashlib
+import threading
+from loguru import logger
+from concurrent.futures import (
+    Future, ThreadPoolExecutor
+)
+from utils import const
+
+
+class MultipartStream(io.RawIOBase):
+    """
+    只写、不可 seek 的流，写入的数据按固定大小切片后直接作为 R2 multipart 分片上传。
+
+    - 边写边计算 SHA-256 与总大小，上传完成即得到完整文件元信息，无需落盘再读
+    - 分片在独立线程池中并发上传，在途分片数受 `concurrency` 限制，内存占用约为 `part_size * (concurrency + 1)`
+    - 单个分片失败按指数退避重试 `retries` 次，仍失败则中止整个上传
+    - 除最后一片外所有分片大小严格一致（R2 要求）
+    - 指定 `tap` 时写入的数据同时转交给它（如 `ChunkManifest.feed`），同一遍数据完成分块
+
+    可直接作为 `zipfile.ZipFile` 的目标文件对象；zipfile 检测到不可 seek 时自动改用数据描述符写法。
+    """
+
+    def __init__(
+        self,
+        client: typing.Any,
+        bucket: str,
+        key: str,
+        extra: typing.Optional[dict] = None,
+        part_size: int = const.R2_PART_SIZE,
+        concurrency: int = const.R2_PART_CONCURRENCY,
+        retries: int = const.R2_PART_RETRIES,
+        tap: typing.Optional[typing.Callable[[bytes], None]] = None
+    ):
+        super().__init__()
+
+        self.client: typing.Any = client
+        self.bucket: str = bucket
+        self.key: str = key
+        self.part_size: int = part_size
+        self.retries: int = retries
+        self.tap: typing.Optional[typing.Callable[[bytes], None]] = tap
+
+        self.sha256 = hashlib.sha256()
+        self.size: int = 0
+
+        self.buffer: bytearray = bytearray()
+        self.number: int = 0
+        self.futures: list[Future] = []
+        self.slots: threading.BoundedSemaphore = threading.BoundedSemaphore(concurrency)
+        self.executor: ThreadPoolExecutor = ThreadPoolExecutor(
+            max_workers=concurrency, thread_name_prefix="r2-part"
+        )
+
+        self.upload_id: str = client.create_multipart_upload(
+            Bucket=bucket, Key=key, **(extra or {})
+        )["UploadId"]
+
+    def __str__(self) -> str:
+        return f"<MultipartStream {self.bucket}/{self.key} parts={self.number} size={self.size}>"
+
+    __repr__ = __str__
+
+    def writable(self) -> bool:
+        return True
+
+    def write(self, data: typing.Union[bytes, bytearray, memoryview]) -> int:
+        if self.closed:
+            raise ValueError("write to closed stream")
+
+        self.sha256.update(data)
+        self.size += len(data)
+        self.buffer += data
+
+        if self.tap:
+            self.tap(data)
+
+        while len(self.buffer) >= self.part_size:
+            part = bytes(self.buffer[:self.part_size])
+            del self.buffer[:self.part_size]
+            self.submit(part)
+
+        return len(data)
+
+    def submit(self, body: bytes) -> None:
+        # 先检查已完成分片，尽早暴露失败，避免继续压缩
+        for future in self.futures:
+            if future.done() and future.exception():
+                raise future.exception()
+
+        self.slots.acquire()
+        self.number += 1
+
+        future = self.executor.submit(self.upload_part, self.number, body)
+        future.add_done_callback(lambda _: self.slots.release())
+        self.futures.append(future)
+
+    def upload_part(self, number: int, body: bytes) -> dict:
+        for attempt in range(1, self.retries + 1):
+            start = time.perf_counter()
+            try:
+                response = self.client.upload_part(
+                    Bucket=self.bucket, Key=self.key, UploadId=self.upload_id, PartNumber=number, Body=body
+                )
+                cost = (time.perf_counter() - start) * 1000
+                logger.info(f"分片上传完成 -> #{number} {len(body) / 1048576:.1f}MB {cost:.0f}ms")
+                return {"PartNumber": number, "ETag": response["ETag"]}
+            except Exception as e:
+                if attempt == self.retries:
+                    raise
+                logger.warning(f"分片 #{number} 上传失败，第 {attempt} 次重试: {e}")
+                time.sleep(2 ** attempt)
+
+    def complete(self) -> dict:
+        """
+        上传剩余数据并合并分片。
+
+        Returns
+        -------
+        dict
+            {"key": str, "size": int, "hash": str, "parts": int}
+        """
+        if self.buffer or self.number == 0:
+            part, self.buffer = bytes(self.buffer), bytearray()
+            self.submit(part)
+
+        parts = [future.result() for future in self.futures]
+        self.client.complete_multipart_upload(
+            Bucket=self.bucket, Key=self.key, UploadId=self.upload_id, MultipartUpload={"Parts": parts}
+        )
+        self.executor.shutdown(wait=True)
+
+        return {"key": self.key, "size": self.size, "hash": self.sha256.hexdigest(), "parts": len(parts)}
+
+    def abort(self) -> None:
+        for future in self.futures:
+            future.cancel()
+        self.executor.shutdown(wait=True)
+
+        try:
+            self.client.abort_multipart_upload(Bucket=self.bucket, Key=self.key, UploadId=self.upload_id)
+            logger.warning(f"分片上传已中止 -> {self.key}")
+        except Exception as e:
+            logger.error(f"分片上传中止失败 {self.key}: {e}")
+
+
+if __name__ == '__main__':
+    pass
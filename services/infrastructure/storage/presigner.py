@@ -0,0 +1,118 @@
+#  ____                _
+# |  _ \ _ __ ___  ___(_) __ _ _ __   ___ _ __
+# | |_) | '__/ _ \/ __| |/ _` | '_ \ / _ \ '__|
+# |  __/| | |  __/\__ \ | (_| | | | |  __/ |
+# |_|   |_|  \___||___/_|\__, |_| |_|\___|_|
+#                        |___/
+#
+
+import hmac
+import hashlib
+import datetime
+from urllib.parse import (
+    quote, urlsplit
+)
+
+ALGORITHM = "AWS4-HMAC-SHA256"
+
+
+def _quote(value: str, safe: str = "-_.~") -> str:
+    return quote(value, safe=safe)
+
+
+class SigV4Presigner(object):
+    """
+    轻量 SigV4 查询串预签名（仅 GET，path-style），与 boto3 `generate_presigned_url("get_object")` 输出一致。
+
+    - 派生签名密钥按 UTC 日期缓存，同一天内只做一次 4 轮 HMAC
+    - 签名时间由调用方传入，同一时间桶内各 worker 生成完全相同的 URL
+    - `presign_many` 共享时间戳与签名密钥，批量签名
+    """
+
+    def __init__(self, access_key: str, secret_key: str, endpoint: str, region: str = "auto", service: str = "s3"):
+        self.access_key: str = access_key
+        self.secret_key: str = secret_key
+        self.endpoint: str = endpoint.rstrip("/")
+        self.host: str = urlsplit(self.endpoint).netloc
+        self.region: str = region
+        self.service: str = service
+
+        self.signing_keys: dict[str, bytes] = {}
+
+    def __str__(self) -> str:
+        return f"<SigV4 Presigner {self.host}>"
+
+    __repr__ = __str__
+
+    def signing_key(self, date: str) -> bytes:
+        if (key := self.signing_keys.get(date)) is None:
+            key = f"AWS4{self.secret_key}".encode()
+            for part in (date, self.region, self.service, "aws4_request"):
+                key = hmac.new(key, part.encode(), hashlib.sha256).digest()
+            self.signing_keys = {date: key}
+        return key
+
+    def presign_get(
+        self,
+        bucket: str,
+        key: str,
+        expires_in: int,
+        signed_at: datetime.datetime,
+        params: dict[str, str] = None
+    ) -> str:
+        """
+        Parameters
+        ----------
+        bucket : str
+            存储桶名称
+        key : str
+            对象 Key
+        expires_in : int
+            有效期（秒），自 `signed_at` 起算，最长 7 天
+        signed_at : datetime
+            UTC 签名时间
+        params : dict, optional
+            附加查询参数，例如 `response-content-disposition`
+
+        Returns
+        -------
+        str
+            预签名 URL
+        """
+        stamp = signed_at.strftime("%Y%m%dT%H%M%SZ")
+        date  = stamp[:8]
+        scope = f"{date}/{self.region}/{self.service}/aws4_request"
+        path  = f"/{bucket}/{_quote(key, safe='-_.~/')}"
+
+        query = [(_quote(k), _quote(v)) for k, v in (params or {}).items()] + [
+            ("X-Amz-Algorithm", ALGORITHM),
+            ("X-Amz-Credential", _quote(f"{self.access_key}/{scope}")),
+            ("X-Amz-Date", stamp),
+            ("X-Amz-Expires", str(expires_in)),
+            ("X-Amz-SignedHeaders", "host")
+        ]
+        canonical_query = "&".join(f"{k}={v}" for k, v in sorted(query))
+
+        canonical_request = "\n".join([
+            "GET", path, canonical_query, f"host:{self.host}\n", "host", "UNSIGNED-PAYLOAD"
+        ])
+        string_to_sign = "\n".join([
+            ALGORITHM, stamp, scope, hashlib.sha256(canonical_request.encode()).hexdigest()
+        ])
+        signature = hmac.new(self.signing_key(date), string_to_sign.encode(), hashlib.sha256).hexdigest()
+
+        query_string = "&".join(f"{k}={v}" for k, v in query)
+        return f"{self.endpoint}{path}?{query_string}&X-Amz-Signature={signature}"
+
+    def presign_many(
+        self,
+        bucket: str,
+        items: list[tuple[str, dict[str, str]]],
+        expires_in: int,
+        signed_at: datetime.datetime
+    ) -> list[str]:
+        return [self.presign_get(bucket, key, expires_in, signed_at, params) for key, params in items]
+
+
+if __name__ == '__main__':
+    pass
@@ -7,39 +7,80 @@
 #
 
 import os
-import boto3
+import hmac
+import json
+import math
+import time
+import base64
 import typing
+import asyncio
+import hashlib
 import zipfile
+import datetime
+import threading
+import functools
 from pathlib import Path
 from loguru import logger
-from botocore.client import Config
-from botocore.exceptions import ClientError
-from boto3.s3.transfer import TransferConfig
+from urllib.parse import quote
+from concurrent.futures import ThreadPoolExecutor
+from services.infrastructure.storage.chunk_manifest import ChunkManifest
+from services.infrastructure.storage.multipart import MultipartStream
+from services.infrastructure.storage.presigner import SigV4Presigner
 from utils import (
     const, toolset
 )
+from utils.ttl_cache import TTLCache
 
 env = toolset.current_env(
-    const.R2_BUCKET_KEY, const.R2_BUCKET_USR, const.R2_BUCKET_PWD,
-    const.R2_BUCKET_URL, const.R2_PUBLIC_URL
+    const.R2_BUCKET_KEY, const.R2_BUCKET_USR, const.R2_BUCKET_PWD, const.R2_BUCKET_URL
 )
 
-r2_bucket_key = env[const.R2_BUCKET_KEY]
-r2_bucket_usr = env[const.R2_BUCKET_USR]
-r2_bucket_pwd = env[const.R2_BUCKET_PWD]
-r2_bucket_url = env[const.R2_BUCKET_URL]
-r2_public_url = env[const.R2_PUBLIC_URL]
+# 公共域名下载为可选功能，未配置时回退为预签名，不影响启动
+public_env = toolset.optional_env(
+    const.R2_PUBLIC_URL, const.R2_LINK_SECRET
+)
+
+r2_bucket_key  = env[const.R2_BUCKET_KEY]
+r2_bucket_usr  = env[const.R2_BUCKET_USR]
+r2_bucket_pwd  = env[const.R2_BUCKET_PWD]
+r2_bucket_url  = env[const.R2_BUCKET_URL]
+r2_public_url  = public_env[const.R2_PUBLIC_URL]
+r2_link_secret = public_env[const.R2_LINK_SECRET]
 
 
 class R2Storage(object):
+    """
+    Cloudflare R2 存储。
+
+    下载签名走原生 `SigV4Presigner`，请求路径上不加载 boto3；
+    boto3 客户端仅在上传 / 检查对象时首次使用才创建。
+
+    下载链接两种模式（`download_urls`）：
+    - presign : S3 预签名 URL，直连 R2
+    - public  : `R2_PUBLIC_URL` 自定义域名 + HMAC 令牌，经 CDN 边缘缓存
+    """
 
     def __init__(self):
-        self.r2_client = boto3.client(
+        self.presigner: SigV4Presigner = SigV4Presigner(
+            access_key=r2_bucket_usr, secret_key=r2_bucket_pwd, endpoint=r2_bucket_url
+        )
+
+        # (key, disposition_filename, expires_in) -> 签名 URL
+        self.presigned: TTLCache = TTLCache(maxsize=const.PRESIGN_CACHE_SIZE, ttl=const.PRESIGN_BUCKET)
+        self.presign_lock: threading.Lock = threading.Lock()
+
+    @functools.cached_property
+    def r2_client(self) -> typing.Any:
+        import boto3
+        from botocore.client import Config
+
+        return boto3.client(
             "s3",
             endpoint_url=r2_bucket_url,
             aws_access_key_id=r2_bucket_usr,
             aws_secret_access_key=r2_bucket_pwd,
-            config=Config(signature_version="s3v4"),
+            # 线程池调用与 multipart 分片线程共用此连接池
+            config=Config(signature_version="s3v4", max_pool_connections=const.R2_WORKERS + const.R2_PART_CONCURRENCY),
             region_name="auto"
         )
 
@@ -74,18 +115,133 @@ class R2Storage(object):
         """
         生成支持播放 + 下载的签名 URL，Content-Disposition 为 inline。
         """
-        signed_url = self.r2_client.generate_presigned_url(
-            "get_object",
-            Params={
-                "Bucket": const.BUCKET,
-                "Key": key,
-                "ResponseContentDisposition": f'inline; filename="{disposition_filename}"'
-            },
-            ExpiresIn=expires_in
+        return self.signed_urls_for_stream([(key, disposition_filename)], expires_in)[0]
+
+    def signed_urls_for_stream(
+        self,
+        items: list[tuple[str, str]],
+        expires_in: int
+    ) -> list[str]:
+        """
+        批量生成签名 URL。
+
+        - 签名时间取 `const.PRESIGN_BUCKET` 秒时间桶的起点，过期时刻向上对齐到桶边界，
+          同一时间桶内所有 worker 对同一对象生成完全相同的 URL
+        - 同一 (key, filename, expires_in) 在剩余有效期高于 `const.PRESIGN_MIN_REMAINING` 比例前复用同一 URL
+
+        Parameters
+        ----------
+        items : list[tuple[str, str]]
+            (对象 Key, 下载文件名) 列表
+        expires_in : int
+            最短有效期（秒）
+
+        Returns
+        -------
+        list[str]
+            与 `items` 顺序一致的签名 URL
+        """
+        urls, missing = [None] * len(items), []
+
+        with self.presign_lock:
+            for i, (key, filename) in enumerate(items):
+                if (url := self.presigned.get((key, filename, expires_in))) is None:
+                    missing.append(i)
+                else:
+                    urls[i] = url
+
+        if not missing:
+            return urls
+
+        now        = time.time()
+        bucket     = const.PRESIGN_BUCKET
+        signed_at  = math.floor(now / bucket) * bucket
+        expires_at = math.ceil((now + expires_in) / bucket) * bucket
+
+        signed = self.presigner.presign_many(
+            const.BUCKET,
+            [
+                (items[i][0], {"response-content-disposition": f'inline; filename="{items[i][1]}"'})
+                for i in missing
+            ],
+            expires_in=expires_at - signed_at,
+            signed_at=datetime.datetime.fromtimestamp(signed_at, datetime.timezone.utc)
         )
-        logger.info(f"R2 签名完成 -> {key}")
 
-        return signed_url
+        with self.presign_lock:
+            for i, url in zip(missing, signed):
+                key, filename = items[i]
+                urls[i] = url
+                self.presigned.set(
+                    (key, filename, expires_in), url, ttl=expires_at - now - expires_in * const.PRESIGN_MIN_REMAINING
+                )
+                logger.info(f"R2 签名完成 -> {key}")
+
+        return urls
+
+    @staticmethod
+    def public_token(path: str, expires_at: int) -> str:
+        """
+        公共域名下载令牌：base64url(HMAC-SHA256(R2_LINK_SECRET, "{path}:{exp}")) 截取前 `const.PUBLIC_TOKEN_BYTES` 字节，
+        `path` 为 URL 编码后的路径（以 `/` 开头），与边缘侧看到的 pathname 一致。
+
+        边缘侧（Worker / WAF 规则）按相同规则校验 `exp` 与 `token`，校验通过后忽略查询串命中缓存。
+        `R2_LINK_SECRET` 为独立密钥，只下发给边缘侧，不复用 R2 访问凭据。
+        """
+        digest = hmac.new(
+            r2_link_secret.encode(const.CHARSET), f"{path}:{expires_at}".encode(const.CHARSET), hashlib.sha256
+        ).digest()[:const.PUBLIC_TOKEN_BYTES]
+        return base64.urlsafe_b64encode(digest).rstrip(b"=").decode()
+
+    def public_urls(
+        self,
+        keys: list[str],
+        expires_in: int
+    ) -> list[str]:
+        """
+        批量生成公共域名下载 URL。
+
+        过期时刻向上对齐到 `const.PUBLIC_LINK_BUCKET` 秒边界，同一时间窗口内所有请求拿到完全相同的 URL，
+        CDN 可直接复用边缘缓存。实际有效期介于 `expires_in` 与 `expires_in + PUBLIC_LINK_BUCKET` 之间。
+        """
+        bucket     = const.PUBLIC_LINK_BUCKET
+        expires_at = math.ceil((time.time() + expires_in) / bucket) * bucket
+        base       = r2_public_url.rstrip("/")
+
+        paths = [f"/{quote(key, safe='/-_.~')}" for key in keys]
+        return [
+            f"{base}{path}?exp={expires_at}&token={self.public_token(path, expires_at)}" for path in paths
+        ]
+
+    def download_urls(
+        self,
+        items: list[tuple[str, str]],
+        expires_in: int,
+        mode: str = const.R2_LINK_PRESIGN
+    ) -> list[str]:
+        """
+        按模式批量生成下载 URL；`public` 模式下未配置 `R2_PUBLIC_URL` 时回退为预签名。
+
+        Parameters
+        ----------
+        items : list[tuple[str, str]]
+            (对象 Key, 下载文件名) 列表
+        expires_in : int
+            最短有效期（秒）
+        mode : str
+            `const.R2_LINK_PRESIGN` 或 `const.R2_LINK_PUBLIC`
+
+        Returns
+        -------
+        list[str]
+            与 `items` 顺序一致的下载 URL
+        """
+        if mode == const.R2_LINK_PUBLIC:
+            if r2_public_url and r2_link_secret:
+                return self.public_urls([key for key, _ in items], expires_in)
+            logger.warning(f"未配置 {const.R2_PUBLIC_URL} / {const.R2_LINK_SECRET}，回退为预签名下载")
+
+        return self.signed_urls_for_stream(items, expires_in)
 
     def file_exists(
         self,
@@ -94,6 +250,8 @@ class R2Storage(object):
         """
         检查文件是否已存在于 R2。
         """
+        from botocore.exceptions import ClientError
+
         try:
             self.r2_client.head_object(Bucket=const.BUCKET, Key=key)
             return True
@@ -102,17 +260,43 @@ class R2Storage(object):
                 return False
             logger.error(f"R2 检查失败: {e}")
 
+    def publish_chunks(
+        self,
+        file_path: str,
+        key: str,
+        *,
+        bucket: str = const.BUCKET
+    ) -> dict:
+        """
+        为已上传到 `key` 的本地文件做内容定义分块并发布分块清单（块本身不单独上传）。
+
+        Returns
+        -------
+        dict
+            分块清单引用 {"key", "hash", "chunks"}，可写入元信息 `manifest` 字段。
+        """
+        return ChunkManifest(self.r2_client, key, bucket).publish(file_path)
+
     def compress_and_upload_folder(
         self,
         folder_path: str,
         r2_prefix: str,
         display_name: str,
         *,
-        bucket: str = const.BUCKET
+        bucket: str = const.BUCKET,
+        chunked: bool = False,
+        force: bool = False
     ) -> dict:
         """
         压缩指定文件夹并上传至 R2 存储。
 
+        单遍流水线：压缩输出按分片直接上传（`MultipartStream`），同时计算大小与 SHA-256，
+        不写临时文件，也不再回读压缩包。`chunked=True` 时同一遍数据再经 `ChunkManifest`
+        做内容定义分块并发布分块清单，清单引用写入元信息 `manifest` 字段。
+
+        上传前用 `toolset.file_hasher().manifest` 计算目录树指纹（未变化的文件命中哈希缓存），
+        与上次发布记录 `{r2_key}{const.PUBLISH_RECORD}` 一致时跳过压缩上传，直接返回上次的元信息。
+
         Parameters
         ----------
         folder_path : str
@@ -127,6 +311,12 @@ class R2Storage(object):
         bucket : str, optional
             R2 的存储桶名称，默认使用全局 const.BUCKET。
 
+        chunked : bool, optional
+            是否同时发布分块清单，供客户端按 Range 增量更新。
+
+        force : bool, optional
+            忽略上次发布记录，强制重新压缩上传。
+
         Returns
         -------
         dict
@@ -142,50 +332,178 @@ class R2Storage(object):
             raise ValueError(f"❌ 目录为空，无法压缩上传: {folder_path}")
 
         zip_name = f"{display_name}.zip"
-        zip_path = Path("/tmp") / zip_name
+        r2_key   = f"{r2_prefix.rstrip('/')}/{zip_name}"
+        record   = f"{r2_key}{const.PUBLISH_RECORD}"
+
+        # 目录树指纹与上次发布一致时不再压缩上传
+        tree = toolset.file_hasher().manifest(folder_path)["hash"]
+        if not force and (previous := self.read_json(bucket, record)) and previous.get("tree") == tree:
+            if not chunked or previous["metadata"].get("manifest"):
+                logger.info(f"⏭️ 目录未变化，跳过上传 -> {bucket}/{r2_key} tree={tree[:16]}")
+                return previous["metadata"]
+
+        extra = {
+            "ContentType"        : "application/zip",
+            "ContentDisposition" : f'attachment; filename="{zip_name}"'
+        }
+
+        # 压缩输出直接写入分片流，不落盘；已压缩格式仅存储不再压缩
+        logger.info(f"📦 流式压缩上传 {folder_path} -> {bucket}/{r2_key}")
+        chunks = ChunkManifest(self.r2_client, r2_key, bucket) if chunked else None
+        stream = MultipartStream(self.r2_client, bucket, r2_key, extra, tap=chunks.feed if chunks else None)
 
         try:
-            # 压缩目录
-            logger.info(f"📦 压缩目录 {folder_path} 到 {zip_path}")
-            with zipfile.ZipFile(zip_path, 'w', zipfile.ZIP_DEFLATED) as zipf:
-                for root, _, files in os.walk(folder_path):
-                    for file in files:
+            with zipfile.ZipFile(stream, 'w', zipfile.ZIP_DEFLATED) as zipf:
+                # 目录与文件都按名称排序，成员顺序（进而分块边界）与文件系统遍历顺序无关
+                for root, dirs, files in os.walk(folder_path):
+                    dirs.sort()
+                    for file in sorted(files):
                         abs_path = os.path.join(root, file)
                         rel_path = os.path.relpath(abs_path, folder_path)
-                        zipf.write(abs_path, arcname=os.path.join(display_name, rel_path))
-            logger.success(f"✅ 目录已压缩为 {zip_path}")
-
-            # 上传配置
-            config = TransferConfig(
-                multipart_threshold=50 * 1024 * 1024,
-                multipart_chunksize=50 * 1024 * 1024
-            )
-            r2_key = f"{r2_prefix.rstrip('/')}/{zip_name}"
-
-            logger.info(f"🚀 上传到 R2: {bucket}/{r2_key}")
-            self.r2_client.upload_file(
-                Filename=str(zip_path),
-                Bucket=bucket,
-                Key=r2_key,
-                ExtraArgs={
-                    "ContentType": "application/zip",
-                    "ContentDisposition": f'attachment; filename="{zip_name}"'
-                },
-                Config=config
-            )
-            logger.success(f"✅ 上传成功: {r2_key}")
-
-            # 构建元信息
-            metadata = toolset.generate_metadata(zip_path, display_name)
-            logger.success(metadata)
-
-            return metadata
+                        compress = zipfile.ZIP_STORED if file.lower().endswith(
+                            const.ZIP_STORED_SUFFIXES
+                        ) else zipfile.ZIP_DEFLATED
+                        zipf.write(abs_path, arcname=os.path.join(display_name, rel_path), compress_type=compress)
+
+            result   = stream.complete()
+            manifest = chunks.finish() if chunks else None
+
+        except BaseException:
+            stream.abort()
+            raise
+
+        logger.success(f"✅ 上传成功: {r2_key} parts={result['parts']}")
+
+        # 构建元信息（大小与哈希在上传过程中已得到）
+        metadata = toolset.build_metadata(display_name, result["size"], result["hash"], manifest=manifest)
+        logger.success(metadata)
+
+        self.r2_client.put_object(
+            Bucket=bucket, Key=record, ContentType="application/json",
+            Body=json.dumps({"tree": tree, "metadata": metadata}).encode(const.CHARSET)
+        )
+
+        return metadata
+
+    def read_json(self, bucket: str, key: str) -> typing.Optional[dict]:
+        """读取 JSON 对象，不存在时返回 None。"""
+
+        from botocore.exceptions import ClientError
+
+        try:
+            body = self.r2_client.get_object(Bucket=bucket, Key=key)["Body"].read()
+        except ClientError as e:
+            if e.response["Error"]["Code"] in ("404", "NoSuchKey", "NotFound"):
+                return None
+            raise
+
+        return json.loads(body)
+
+
+class AsyncR2Storage(object):
+    """
+    `R2Storage` 的异步外观，方法名与同步版本一致。
+
+    - 上传 / HEAD / 目录压缩上传等 boto3 阻塞调用在独立有界线程池中执行，不占用事件循环
+    - boto3 客户端线程安全，连接池大小为 `const.R2_WORKERS + const.R2_PART_CONCURRENCY`，
+      本线程池与 multipart 分片线程复用同一连接池
+    - 预签名为纯 CPU 计算（微秒级）且带缓存，直接在事件循环内完成
+    - 每次阻塞调用记录耗时，超过 `const.R2_SLOW_MS` 时告警
+    """
+
+    def __init__(self, storage: typing.Optional[R2Storage] = None, workers: int = const.R2_WORKERS):
+        self.storage: R2Storage = storage or R2Storage()
+        self.workers: int = workers
+
+        self.executor: ThreadPoolExecutor = ThreadPoolExecutor(
+            max_workers=workers, thread_name_prefix="r2"
+        )
+
+        self.depth: int = 0
+        self.calls: dict[str, int] = {}
+        self.latency_max_ms: dict[str, float] = {}
+
+    def __str__(self) -> str:
+        return f"<AsyncR2Storage workers={self.workers} depth={self.depth}>"
+
+    __repr__ = __str__
 
+    async def run(self, name: str, func: typing.Callable[..., typing.Any], *args, **kwargs) -> typing.Any:
+        loop  = asyncio.get_running_loop()
+        start = time.perf_counter()
+
+        self.depth += 1
+        try:
+            return await loop.run_in_executor(self.executor, functools.partial(func, *args, **kwargs))
         finally:
-            # 清理临时压缩包
-            if zip_path.exists():
-                os.remove(zip_path)
-                logger.info(f"🧹 本地压缩文件已清理: {zip_path}")
+            self.depth -= 1
+
+            cost = (time.perf_counter() - start) * 1000
+            self.calls[name] = self.calls.get(name, 0) + 1
+            self.latency_max_ms[name] = max(self.latency_max_ms.get(name, 0.0), cost)
+
+            if cost > const.R2_SLOW_MS:
+                logger.warning(f"R2 {name} 耗时 {cost:.2f}ms depth={self.depth}")
+            else:
+                logger.info(f"R2 {name} 耗时 {cost:.2f}ms")
+
+    async def upload_file(
+        self,
+        key: str,
+        content: bytes,
+        content_type: str,
+        disposition_filename: str
+    ) -> str:
+        return await self.run(
+            "upload_file", self.storage.upload_file, key, content, content_type, disposition_filename
+        )
+
+    async def file_exists(self, key: str) -> typing.Optional[bool]:
+        return await self.run("file_exists", self.storage.file_exists, key)
+
+    async def compress_and_upload_folder(
+        self,
+        folder_path: str,
+        r2_prefix: str,
+        display_name: str,
+        *,
+        bucket: str = const.BUCKET,
+        chunked: bool = False,
+        force: bool = False
+    ) -> dict:
+        return await self.run(
+            "compress_and_upload_folder",
+            self.storage.compress_and_upload_folder, folder_path, r2_prefix, display_name,
+            bucket=bucket, chunked=chunked, force=force
+        )
+
+    async def publish_chunks(self, file_path: str, key: str, *, bucket: str = const.BUCKET) -> dict:
+        return await self.run("publish_chunks", self.storage.publish_chunks, file_path, key, bucket=bucket)
+
+    async def signed_url_for_stream(self, key: str, expires_in: int, disposition_filename: str) -> str:
+        return self.storage.signed_url_for_stream(key, expires_in, disposition_filename)
+
+    async def signed_urls_for_stream(self, items: list[tuple[str, str]], expires_in: int) -> list[str]:
+        return self.storage.signed_urls_for_stream(items, expires_in)
+
+    async def download_urls(
+        self,
+        items: list[tuple[str, str]],
+        expires_in: int,
+        mode: str = const.R2_LINK_PRESIGN
+    ) -> list[str]:
+        return self.storage.download_urls(items, expires_in, mode)
+
+    def stats(self) -> dict:
+        return {
+            "depth"          : self.depth,
+            "calls"          : dict(self.calls),
+            "latency_max_ms" : {name: round(cost, 2) for name, cost in self.latency_max_ms.items()}
+        }
+
+    async def stop(self) -> None:
+        await asyncio.to_thread(self.executor.shutdown, wait=True)
+        logger.info(f"R2 异步客户端已停止 -> {self.stats()}")
 
 
 if __name__ == '__main__':
@@ -0,0 +1,24 @@
+#   ____             __ _            _
+#  / ___|___  _ __  / _| |_ ___  ___| |_
+# | |   / _ \| '_ \| |_| __/ _ \/ __| __|
+# | |__| (_) | | | |  _| ||  __/\__ \ |_
+#  \____\___/|_| |_|_|  \__\___||___/\__|
+#
+
+import os
+import tempfile
+from utils import (
+    const, toolset
+)
+
+# 服务模块在导入时读取密钥；测试环境没有 `.env` 与 `/etc/secrets`，以占位值代替
+toolset.current_env = lambda *args, **__: {
+    arg: "https://test.invalid" if arg.endswith("_URL") else "test" for arg in args
+}
+
+# 哈希缓存写入临时目录，不污染本机发布缓存
+os.environ.setdefault(const.HASH_CACHE_ENV, os.path.join(tempfile.mkdtemp(), "file_hashes.json"))
+
+
+if __name__ == '__main__':
+    pass
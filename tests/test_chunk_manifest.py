@@ -0,0 +1,190 @@
+#  _____         _      ____ _                 _      __  __             _  __           _
+# |_   _|__  ___| |_   / ___| |__  _   _ _ __ | | __ |  \/  | __ _ _ __ (_)/ _| ___  ___| |_
+#   | |/ _ \/ __| __| | |   | '_ \| | | | '_ \| |/ / | |\/| |/ _` | '_ \| | |_ / _ \/ __| __|
+#   | |  __/\__ \ |_  | |___| | | | |_| | | | |   <  | |  | | (_| | | | | |  _|  __/\__ \ |_
+#   |_|\___||___/\__|  \____|_| |_|\__,_|_| |_|_|\_\ |_|  |_|\__,_|_| |_|_|_|  \___||___/\__|
+#
+
+import io
+import os
+import json
+import random
+import hashlib
+import threading
+import pytest
+from utils import const
+
+pytest.importorskip("botocore")
+
+from services.domain.standard import resource
+from services.infrastructure.storage import r2_storage
+
+PREFIX = "model-store"
+NAME   = "demo"
+KEY    = f"{PREFIX}/{NAME}.zip"
+
+
+class FakeR2(object):
+    """内存版 R2：分片合并后的对象与普通对象都存入 `objects`，支持 Range 读取。"""
+
+    def __init__(self):
+        self.objects: dict[str, bytes] = {}
+        self.parts: dict[str, dict[int, bytes]] = {}
+        self.lock: threading.Lock = threading.Lock()
+
+    def __str__(self) -> str:
+        return f"<FakeR2 objects={len(self.objects)}>"
+
+    __repr__ = __str__
+
+    def create_multipart_upload(self, Bucket, Key, **__):
+        self.parts[Key] = {}
+        return {"UploadId": Key}
+
+    def upload_part(self, Bucket, Key, UploadId, PartNumber, Body):
+        with self.lock:
+            self.parts[UploadId][PartNumber] = bytes(Body)
+        return {"ETag": hashlib.md5(Body).hexdigest()}
+
+    def complete_multipart_upload(self, Bucket, Key, UploadId, MultipartUpload):
+        parts = self.parts.pop(UploadId)
+        self.objects[Key] = b"".join(parts[part["PartNumber"]] for part in MultipartUpload["Parts"])
+
+    def abort_multipart_upload(self, Bucket, Key, UploadId):
+        self.parts.pop(UploadId, None)
+
+    def put_object(self, Bucket, Key, Body, **__):
+        self.objects[Key] = bytes(Body)
+
+    def get_object(self, Bucket, Key, Range=None, **__):
+        from botocore.exceptions import ClientError
+
+        if Key not in self.objects:
+            raise ClientError({"Error": {"Code": "NoSuchKey"}}, "GetObject")
+
+        body = self.objects[Key]
+        if Range:
+            start, _, end = Range.removeprefix("bytes=").partition("-")
+            body = body[int(start):int(end) + 1]
+        return {"Body": io.BytesIO(body)}
+
+
+@pytest.fixture()
+def storage():
+    store = r2_storage.R2Storage()
+    store.r2_client = FakeR2()
+    return store
+
+
+@pytest.fixture()
+def folder(tmp_path):
+    # 随机字节不可压缩，产物足够大才能切出多个块
+    rng  = random.Random(2026)
+    root = tmp_path / NAME
+    for sub, size in (("b/weights", 6 << 20), ("a/vocab", 3 << 20), ("c", 2 << 20)):
+        path = root / sub
+        path.mkdir(parents=True)
+        (path / "data.bin").write_bytes(rng.randbytes(size))
+        (path / "config.json").write_text(json.dumps({"sub": sub}))
+    return root
+
+
+def test_manifest_chunks_resolve_by_range(storage, folder):
+    metadata = storage.compress_and_upload_folder(str(folder), PREFIX, NAME, chunked=True)
+    client   = storage.r2_client
+
+    ref      = metadata["manifest"]
+    manifest = json.loads(client.objects[ref["key"]])
+    artifact = client.objects[KEY]
+
+    # 块不单独上传：只有产物、分块清单与发布记录
+    assert set(client.objects) == {KEY, ref["key"], f"{KEY}{const.PUBLISH_RECORD}"}
+    assert ref["hash"] == hashlib.sha256(client.objects[ref["key"]]).hexdigest()
+    assert ref["chunks"] == len(manifest["chunks"]) > 1
+
+    assert manifest["key"] == KEY
+    assert manifest["hash"] == metadata["hash"] == hashlib.sha256(artifact).hexdigest()
+    assert manifest["size"] == metadata["size"] == len(artifact)
+
+    # 客户端按清单对产物 URL 发 Range 请求，逐块校验后拼回完整文件
+    offset, rebuilt = 0, b""
+    for digest, off, size in manifest["chunks"]:
+        assert off == offset
+        assert const.CDC_MIN_SIZE <= size <= const.CDC_MAX_SIZE or off + size == manifest["size"]
+        body = client.get_object(Bucket=const.BUCKET, Key=manifest["key"], Range=f"bytes={off}-{off + size - 1}")["Body"].read()
+        assert hashlib.sha256(body).hexdigest() == digest
+        offset, rebuilt = offset + size, rebuilt + body
+
+    assert rebuilt == artifact
+
+
+def test_unchanged_tree_skips_upload(storage, folder):
+    first  = storage.compress_and_upload_folder(str(folder), PREFIX, NAME, chunked=True)
+    client = storage.r2_client
+    client.objects.pop(KEY)
+
+    assert storage.compress_and_upload_folder(str(folder), PREFIX, NAME, chunked=True) == first
+    assert KEY not in client.objects
+
+
+def test_walk_order_does_not_change_artifact(storage, folder, monkeypatch):
+    first = storage.compress_and_upload_folder(str(folder), PREFIX, NAME, chunked=True)
+    walk  = os.walk
+
+    def reversed_walk(top, *args, **kwargs):
+        # 模拟文件系统以相反顺序列出目录项；调用方原地排序后遍历顺序应不受影响
+        for root, dirs, files in walk(top, *args, **kwargs):
+            dirs.reverse()
+            files.reverse()
+            yield root, dirs, files
+
+    monkeypatch.setattr(r2_storage.os, "walk", reversed_walk)
+    second = storage.compress_and_upload_folder(str(folder), PREFIX, NAME, chunked=True, force=True)
+
+    assert second["hash"] == first["hash"]
+    assert second["manifest"] == first["manifest"]
+
+
+@pytest.mark.parametrize("detached", [False, True])
+def test_download_urls_follow_items(detached):
+    entries = {
+        "plain"      : {"filename": "plain.zip"},
+        "chunked"    : {"filename": "chunked.zip", "manifest": {"key": "chunk-manifest/aa.json"}},
+        "x.manifest" : {"filename": "x.zip", "manifest": {"key": "chunk-manifest/bb.json"}}
+    }
+    names = list(entries)
+
+    chunked, items = resource.download_items(entries, names, PREFIX)
+
+    assert chunked == ["chunked", "x.manifest"]
+    assert items == [
+        (f"{PREFIX}/plain.zip", "plain.zip"),
+        (f"{PREFIX}/chunked.zip", "chunked.zip"),
+        (f"{PREFIX}/x.zip", "x.zip"),
+        ("chunk-manifest/aa.json", "chunked.manifest.json"),
+        ("chunk-manifest/bb.json", "x.manifest.manifest.json")
+    ]
+
+    urls  = [f"https://r2.test/{key}" for key, _ in items]
+    links = {} if detached else None
+    resource.attach_urls(entries, names, chunked, urls, links)
+
+    if detached:
+        assert links == {
+            "plain"               : f"https://r2.test/{PREFIX}/plain.zip",
+            "chunked"             : f"https://r2.test/{PREFIX}/chunked.zip",
+            "x.manifest"          : f"https://r2.test/{PREFIX}/x.zip",
+            "chunked.manifest"    : "https://r2.test/chunk-manifest/aa.json",
+            "x.manifest.manifest" : "https://r2.test/chunk-manifest/bb.json"
+        }
+        assert all("url" not in entry for entry in entries.values())
+    else:
+        assert entries["plain"] == {"filename": "plain.zip", "url": f"https://r2.test/{PREFIX}/plain.zip"}
+        assert entries["chunked"]["url"] == f"https://r2.test/{PREFIX}/chunked.zip"
+        assert entries["chunked"]["manifest_url"] == "https://r2.test/chunk-manifest/aa.json"
+        assert entries["x.manifest"]["manifest_url"] == "https://r2.test/chunk-manifest/bb.json"
+        assert "manifest_url" not in entries["plain"]
+
+
+if __name__ == '__main__':
+    pass
@@ -0,0 +1,92 @@
+#  _____         _     ____                _
+# |_   _|__  ___| |_  |  _ \ _ __ ___  ___(_) __ _ _ __   ___ _ __
+#   | |/ _ \/ __| __| | |_) | '__/ _ \/ __| |/ _` | '_ \ / _ \ '__|
+#   | |  __/\__ \ |_  |  __/| | |  __/\__ \ | (_| | | | |  __/ |
+#   |_|\___||___/\__| |_|   |_|  \___||___/_|\__, |_| |_|\___|_|
+#                                            |___/
+#
+
+import datetime
+from unittest import mock
+import pytest
+from services.infrastructure.storage.presigner import SigV4Presigner
+
+boto3 = pytest.importorskip("boto3")
+
+ENDPOINT   = "https://account.r2.cloudflarestorage.com"
+ACCESS_KEY = "AKIDEXAMPLE"
+SECRET_KEY = "wJalrXUtnFEMI/K7MDENG+bPxRfiCYEXAMPLEKEY"
+BUCKET     = "appserver-bucket"
+SIGNED_AT  = datetime.datetime(2026, 10, 18, 6, 20, 0)
+
+KEYS = [
+    "model-store/model.zip",
+    "toolkit-store/Framix/MacOS/tool kit.zip",
+    "toolkit-store/Framix/MacOS/a+b.zip",
+    "toolkit-store/Framix/MacOS/~tilde~.zip",
+    "speech/中文 语音.mp3",
+    "speech/café-ü.mp3",
+    "reserved/!*'();:@&=$,?#[]%.zip"
+]
+
+
+@pytest.fixture(scope="module")
+def client():
+    from botocore.client import Config
+
+    return boto3.client(
+        "s3",
+        endpoint_url=ENDPOINT,
+        aws_access_key_id=ACCESS_KEY,
+        aws_secret_access_key=SECRET_KEY,
+        region_name="auto",
+        config=Config(signature_version="s3v4")
+    )
+
+
+def boto3_url(client, key: str, params: dict, expires_in: int = 3600) -> str:
+    import botocore.auth
+
+    # 冻结 botocore 的签名时钟（新旧版本分别使用 get_current_datetime / datetime.utcnow）
+    with mock.patch.object(botocore.auth.datetime, "datetime", wraps=datetime.datetime) as frozen:
+        frozen.utcnow.return_value = SIGNED_AT
+        with mock.patch("botocore.auth.get_current_datetime", return_value=SIGNED_AT, create=True):
+            return client.generate_presigned_url(
+                "get_object", Params={"Bucket": BUCKET, "Key": key, **params}, ExpiresIn=expires_in
+            )
+
+
+@pytest.mark.parametrize("key", KEYS)
+def test_presign_get_matches_boto3(client, key):
+    presigner = SigV4Presigner(ACCESS_KEY, SECRET_KEY, ENDPOINT)
+
+    assert presigner.presign_get(BUCKET, key, 3600, SIGNED_AT) == boto3_url(client, key, {})
+
+
+@pytest.mark.parametrize("key", KEYS)
+def test_presign_get_disposition_matches_boto3(client, key):
+    presigner   = SigV4Presigner(ACCESS_KEY, SECRET_KEY, ENDPOINT)
+    disposition = f'inline; filename="{key.rsplit("/", 1)[-1]}"'
+
+    expected = boto3_url(client, key, {"ResponseContentDisposition": disposition})
+    actual   = presigner.presign_get(
+        BUCKET, key, 3600, SIGNED_AT, {"response-content-disposition": disposition}
+    )
+
+    assert actual == expected
+
+
+def test_presign_many_matches_boto3(client):
+    presigner = SigV4Presigner(ACCESS_KEY, SECRET_KEY, ENDPOINT)
+    items     = [(key, {"response-content-disposition": f'inline; filename="{i}.zip"'}) for i, key in enumerate(KEYS)]
+
+    expected = [
+        boto3_url(client, key, {"ResponseContentDisposition": params["response-content-disposition"]}, 600)
+        for key, params in items
+    ]
+
+    assert presigner.presign_many(BUCKET, items, 600, SIGNED_AT) == expected
+
+
+if __name__ == '__main__':
+    pass
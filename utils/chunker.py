@@ -0,0 +1,109 @@
+#   ____ _                 _
+#  / ___| |__  _   _ _ __ | | _____ _ __
+# | |   | '_ \| | | | '_ \| |/ / _ \ '__|
+# | |___| | | | |_| | | | |   <  __/ |
+#  \____|_| |_|\__,_|_| |_|_|\_\___|_|
+#
+
+import typing
+import hashlib
+import numpy as np
+from utils import const
+
+# Gear 表：GEAR[i] = SHA-256(bytes([i])) 前 4 字节（大端），客户端可按同一规则复现分块
+GEAR = np.array(
+    [int.from_bytes(hashlib.sha256(bytes([i])).digest()[:4], "big") for i in range(256)], dtype=np.uint32
+)
+
+WINDOW = 32
+
+
+def gear_hash(data: np.ndarray) -> np.ndarray:
+    """
+    向量化计算每个位置的 32 位 Gear 滚动哈希：
+
+        h[i] = Σ GEAR[data[i - k]] << k  (k = 0..31, mod 2^32)
+
+    等价于逐字节 `h = (h << 1) + GEAR[b]`，用倍增法 5 轮移位相加完成，起始位置之前视为 0。
+    """
+    h = GEAR[data]
+    for step in (1, 2, 4, 8, 16):
+        h[step:] += h[:-step] << np.uint32(step)
+    return h
+
+
+class GearChunker(object):
+    """
+    基于 Gear 哈希的内容定义分块（CDC）。
+
+    - 哈希高位与 `mask` 全零处切分（低位只依赖最近几个字节，不参与判断），期望块大小约 `avg_size`
+    - 块大小限制在 [`min_size`, `max_size`]，超过上限强制切分
+    - 插入 / 删除数据只影响附近少数块，其余块边界与哈希不变
+    - 流式处理：`feed` 任意长度数据，返回已确定的块；`finish` 返回最后一块
+    """
+
+    def __init__(
+        self,
+        min_size: int = const.CDC_MIN_SIZE,
+        avg_size: int = const.CDC_AVG_SIZE,
+        max_size: int = const.CDC_MAX_SIZE
+    ):
+        self.min_size: int = min_size
+        self.avg_size: int = avg_size
+        self.max_size: int = max_size
+
+        bits = avg_size.bit_length() - 1
+        self.mask: np.uint32 = np.uint32(((1 << bits) - 1) << (WINDOW - bits))
+
+        self.tail: bytes = b""
+        self.pending: bytearray = bytearray()
+
+    def __str__(self) -> str:
+        return f"<GearChunker {self.min_size}/{self.avg_size}/{self.max_size}>"
+
+    __repr__ = __str__
+
+    def feed(self, data: typing.Union[bytes, bytearray, memoryview]) -> list[bytes]:
+        if not len(data):
+            return []
+
+        # 带上上一段末尾 31 字节，保证跨段滚动哈希连续
+        window = np.frombuffer(self.tail + bytes(data), dtype=np.uint8)
+        hashes = gear_hash(window)[len(self.tail):]
+        marks  = np.flatnonzero((hashes & self.mask) == 0) + 1
+
+        base = len(self.pending)
+        self.pending += data
+        self.tail = bytes(window[-(WINDOW - 1):])
+
+        chunks, cursor = [], 0
+        for mark in (marks + base).tolist():
+            while mark - cursor > self.max_size:
+                chunks.append(bytes(self.pending[cursor:cursor + self.max_size]))
+                cursor += self.max_size
+            if mark - cursor >= self.min_size:
+                chunks.append(bytes(self.pending[cursor:mark]))
+                cursor = mark
+
+        while len(self.pending) - cursor > self.max_size:
+            chunks.append(bytes(self.pending[cursor:cursor + self.max_size]))
+            cursor += self.max_size
+
+        del self.pending[:cursor]
+        return chunks
+
+    def finish(self) -> list[bytes]:
+        chunks, self.pending, self.tail = [bytes(self.pending)] if self.pending else [], bytearray(), b""
+        return chunks
+
+    def params(self) -> dict:
+        return {
+            "algorithm" : "gear32",
+            "min"       : self.min_size,
+            "avg"       : self.avg_size,
+            "max"       : self.max_size
+        }
+
+
+if __name__ == '__main__':
+    pass
@@ -0,0 +1,111 @@
+#   ____          _
+#  / ___|___   __| | ___  ___
+# | |   / _ \ / _` |/ _ \/ __|
+# | |__| (_) | (_| |  __/ (__
+#  \____\___/ \__,_|\___|\___|
+#
+
+import json
+import typing
+from utils import const
+
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+try:
+    import msgpack
+except ImportError:
+    msgpack = None
+
+try:
+    import zstandard
+except ImportError:
+    zstandard = None
+
+# 首字节格式标记；合法 JSON 文本不会以这些控制字符开头，旧数据据此识别
+TAG_JSON    = b"\x01"
+TAG_MSGPACK = b"\x02"
+TAG_ZSTD    = b"\x03"
+
+TAGS = (TAG_JSON, TAG_MSGPACK, TAG_ZSTD)
+
+_compressor   = zstandard.ZstdCompressor(level=const.CACHE_ZSTD_LEVEL) if zstandard else None
+_decompressor = zstandard.ZstdDecompressor() if zstandard else None
+
+
+def dumps_json(value: typing.Any) -> bytes:
+    if orjson is not None:
+        return orjson.dumps(value, option=orjson.OPT_NON_STR_KEYS)
+    return json.dumps(value, ensure_ascii=False, separators=(",", ":")).encode(const.CHARSET)
+
+
+def loads_json(data: typing.Union[bytes, str]) -> typing.Any:
+    return orjson.loads(data) if orjson is not None else json.loads(data)
+
+
+def encode(
+    value: typing.Any,
+    fmt: str = const.CACHE_CODEC,
+    compress_min: int = const.CACHE_COMPRESS_MIN
+) -> bytes:
+    """
+    序列化缓存值。
+
+    Parameters
+    ----------
+    value : Any
+        待写入的值
+    fmt : str
+        `json`    - 无标记的纯 JSON 文本，与旧格式一致，适用于需要人工查看/编辑的 key
+        `orjson`  - JSON + 标记字节
+        `msgpack` - MessagePack + 标记字节，未安装 msgpack 时退化为 `orjson`
+    compress_min : int
+        编码后超过该字节数且安装了 zstandard 时压缩，<= 0 表示不压缩
+
+    Returns
+    -------
+    bytes
+        写入 Redis 的字节
+    """
+    if fmt == "json":
+        return json.dumps(value, ensure_ascii=False).encode(const.CHARSET)
+
+    if fmt == "msgpack" and msgpack is not None:
+        payload = TAG_MSGPACK + msgpack.packb(value, use_bin_type=True)
+    else:
+        payload = TAG_JSON + dumps_json(value)
+
+    if _compressor is not None and 0 < compress_min <= len(payload):
+        return TAG_ZSTD + _compressor.compress(payload)
+    return payload
+
+
+def decode(data: typing.Optional[typing.Union[bytes, str]]) -> typing.Any:
+    """反序列化缓存值，兼容旧的纯 JSON 文本与普通字符串。"""
+
+    if data is None:
+        return None
+
+    if isinstance(data, bytes) and data[:1] in TAGS:
+        tag, body = data[:1], data[1:]
+        if tag == TAG_ZSTD:
+            if _decompressor is None:
+                raise RuntimeError("zstandard is required to decode compressed cache values")
+            return decode(_decompressor.decompress(body))
+        if tag == TAG_MSGPACK:
+            if msgpack is None:
+                raise RuntimeError("msgpack is required to decode msgpack cache values")
+            return msgpack.unpackb(body, raw=False)
+        return loads_json(body)
+
+    text = data.decode(const.CHARSET, errors="replace") if isinstance(data, bytes) else data
+    try:
+        return json.loads(text)
+    except (json.JSONDecodeError, TypeError):
+        return text
+
+
+if __name__ == '__main__':
+    pass
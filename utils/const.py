@@ -16,6 +16,10 @@ BASE_PUBLIC_KEY  = r"public_key.pem"
 APP_PRIVATE_KEY  = f"app_{BASE_PRIVATE_KEY}"
 APP_PUBLIC_KEY   = f"app_{BASE_PUBLIC_KEY}"
 
+# ==== Notes: 密钥环 ====
+KEY_RING_CHECK = 30
+KEY_RING_GRACE = 600
+
 # ==== Notes: 模版 ====
 TEMPLATES = r"templates"
 
@@ -23,9 +27,22 @@ TEMPLATES = r"templates"
 CONFIGURATION = r"configuration.json"
 
 # ==== Notes: Supabase ====
-SUPABASE_URL  = r"SUPABASE_URL"
-SUPABASE_KEY  = r"SUPABASE_KEY"
-LICENSE_CODES = r"license_codes"
+SUPABASE_URL     = r"SUPABASE_URL"
+SUPABASE_KEY     = r"SUPABASE_KEY"
+LICENSE_CODES    = r"license_codes"
+ACTIVATE_LICENSE = r"activate_license"
+RELEASE_LICENSE  = r"release_license"
+SUPABASE_POOL    = {
+    "max_connections"           : 20,
+    "max_keepalive_connections" : 10,
+    "keepalive_expiry"          : 60
+}
+CODE_BATCH_SIZE  = 1000
+CODE_CONCURRENCY = 4
+CODE_RETRIES     = 3
+CODE_LOOKUP_SIZE = 200
+LICENSE_ROW_TTL  = 120
+LICENSE_DENY_TTL = 60
 
 # ==== Notes: Azure ====
 AZURE_TTS_URL = r"AZURE_TTS_URL"
@@ -34,14 +51,68 @@ AZURE_TTS_KEY = r"AZURE_TTS_KEY"
 # ==== Notes: Redis ====
 REDIS_CACHE_URL = r"REDIS_CACHE_URL"
 REDIS_CACHE_KEY = r"REDIS_CACHE_KEY"
+UPSTASH_L1_SIZE = 1024
+UPSTASH_L1_TTL  = 60
+
+# ==== Notes: 缓存过期 ====
+CACHE_TTL_JITTER   = 0.1
+XFETCH_BETA        = 1.0
+XFETCH_MIN_DELTA   = 0.1
+XFETCH_DELTA_RATIO = 0.02
+
+# ==== Notes: 缓存编码 ====
+CACHE_CODEC        = r"orjson"
+CACHE_COMPRESS_MIN = 1024
+CACHE_ZSTD_LEVEL   = 3
 
 # ==== Notes: Cloudflare ====
 BUCKET        = r"appserver-bucket"
-R2_BUCKET_KEY = r"R2_BUCKET_KEY"
-R2_BUCKET_USR = r"R2_BUCKET_USR"
-R2_BUCKET_PWD = r"R2_BUCKET_PWD"
-R2_BUCKET_URL = r"R2_BUCKET_URL"
-R2_PUBLIC_URL = r"R2_PUBLIC_URL"
+R2_BUCKET_KEY  = r"R2_BUCKET_KEY"
+R2_BUCKET_USR  = r"R2_BUCKET_USR"
+R2_BUCKET_PWD  = r"R2_BUCKET_PWD"
+R2_BUCKET_URL  = r"R2_BUCKET_URL"
+R2_PUBLIC_URL  = r"R2_PUBLIC_URL"
+R2_LINK_SECRET = r"R2_LINK_SECRET"
+
+# ==== Notes: R2 签名缓存 ====
+PRESIGN_CACHE_SIZE    = 4096
+PRESIGN_BUCKET        = 300
+PRESIGN_MIN_REMAINING = 0.5
+
+# ==== Notes: R2 下载链接模式 ====
+R2_LINK_PRESIGN    = r"presign"
+R2_LINK_PUBLIC     = r"public"
+PUBLIC_LINK_BUCKET = 3600
+PUBLIC_TOKEN_BYTES = 16
+
+# ==== Notes: R2 异步客户端 ====
+R2_WORKERS = 8
+R2_SLOW_MS = 500
+
+# ==== Notes: R2 分片上传 ====
+R2_PART_SIZE        = 16 * 1024 * 1024
+R2_PART_CONCURRENCY = 4
+R2_PART_RETRIES     = 3
+ZIP_STORED_SUFFIXES = (
+    ".zip", ".gz", ".tgz", ".bz2", ".xz", ".zst", ".7z", ".rar", ".jar", ".apk", ".whl",
+    ".keras", ".png", ".jpg", ".jpeg", ".webp", ".mp3", ".mp4", ".ogg"
+)
+
+# ==== Notes: 文件哈希 ====
+# 哈希缓存服务于发布端（运维工作站 / CI 的持久化缓存目录），Render 实例不发布产物，其磁盘为临时盘；
+# CI 中可通过环境变量 `HASH_CACHE_ENV` 指向被缓存的目录
+HASH_WORKERS    = 8
+HASH_BUFFER     = 4 * 1024 * 1024
+HASH_CACHE_FILE = r"~/.cache/appserver/file_hashes.json"
+HASH_CACHE_ENV  = r"APPSERVER_HASH_CACHE"
+PUBLISH_RECORD  = r".publish.json"
+
+# ==== Notes: 内容定义分块 ====
+CDC_MIN_SIZE   = 1 * 1024 * 1024
+CDC_AVG_SIZE   = 4 * 1024 * 1024
+CDC_MAX_SIZE   = 16 * 1024 * 1024
+CDC_SEGMENT    = 8 * 1024 * 1024
+CHUNK_MANIFEST = r"chunk-manifest"
 
 # ==== Notes: Zilliz Cloud ====
 ZILLIZ_URL = r"ZILLIZ_URL"
@@ -55,6 +126,31 @@ SHARED_SECRET = r"SHARED_SECRET"
 
 # ==== Notes: 鉴权格式 ====
 TOKEN_FORMAT = r"X-Token"
+TOKEN_LEEWAY = 30
+
+# ==== Notes: 鉴权缓存 ====
+TOKEN_CACHE_SIZE    = 10000
+TOKEN_NEGATIVE_SIZE = 1000
+TOKEN_NEGATIVE_TTL  = 300
+
+# ==== Notes: 签名缓存 ====
+SIGN_CACHE_SIZE  = 2048
+SIGN_CACHE_TTL   = 86400
+SIGN_CACHE_REDIS = False
+LICENSE_LINKS    = r"X-License-Links"
+
+# ==== Notes: 签名服务 ====
+SIGN_WORKERS    = 2
+SIGN_BATCH_SIZE = 32
+SIGN_SLOW_MS    = 200
+
+# ==== Notes: 签名算法协商 ====
+SIGN_ALG_HEADER = r"X-App-Sign-Alg"
+SIGN_ALG_RSA    = r"rs256"
+SIGN_ALG_KEYS   = {
+    "ed25519" : f"ed25519_{BASE_PRIVATE_KEY}",
+    "es256"   : f"es256_{BASE_PRIVATE_KEY}"
+}
 
 # ==== Notes: Modal Apps ====
 DNS          = r"https://plaxtonflarion--web-app.modal.run"
@@ -79,39 +175,47 @@ SETTINGS = {
     "redoc_url": None,
 }
 
-# ==== Notes: Redis Token Bucket ====
-TOKEN_BUCKET_LUA = """
-local key   = KEYS[1]
-local burst = tonumber(ARGV[1])
-local rate  = tonumber(ARGV[2])
-local now   = tonumber(ARGV[3])
+# ==== Notes: Redis Rate Limit (GCRA) ====
+RATE_SYNC_INTERVAL = 0.5
+RATE_ERROR_BUDGET  = 0.2
 
-local data = redis.call("HMGET", key, "tokens", "time")
-local tokens = tonumber(data[1])
-local last   = tonumber(data[2])
+RATE_LIMIT_LUA = """
+local key     = KEYS[1]
+local burst   = tonumber(ARGV[1])
+local rate    = tonumber(ARGV[2])
+local now     = tonumber(ARGV[3])
+local pending = tonumber(ARGV[4]) or 0
+local acquire = tonumber(ARGV[5]) or 1
 
-if tokens == nil then
-    tokens = burst
-    last   = now
-else
-    local delta = (now - last) / 1000.0
-    if delta > 0 then
-        tokens = math.min(burst, tokens + delta * rate)
-    end
+local interval = 1000.0 / rate
+local window   = burst * interval
+
+local tat = math.max(tonumber(redis.call("GET", key)) or now, now)
+tat = math.min(tat + pending * interval, now + window)
+
+local allow_at = tat + acquire * interval - window
+local granted  = now >= allow_at
+if granted then
+    tat = tat + acquire * interval
+end
+
+if granted or pending > 0 then
+    redis.call("SET", key, tostring(tat), "PX", math.max(1, math.ceil(tat - now)))
 end
 
-if tokens >= 1 then
-    tokens = tokens - 1
-    redis.call("HMSET", key, "tokens", tokens, "time", now)
-    redis.call("EXPIRE", key, math.ceil(burst/rate)+2)
-    return tokens
+local tokens = (now + window - tat) / interval
+
+if granted then
+    return {1, tostring(tokens), 0}
 else
-    return -1
+    return {0, tostring(tokens), math.ceil(allow_at - now)}
 end
 """
 
 # ==== Notes: Redis Hot Key ====
 K_MIX = "Mix"
+K_MIX_CHANNEL = "Mix:Changed"
+MIX_POLL_INTERVAL = 30
 V_MIX = {
   "app": {
     "Azure": {
@@ -128,6 +232,12 @@ V_MIX = {
       "llm": {
         "name": "llama-3.1-8b-instant"
     }
+  },
+  "R2": {
+    "download": {
+      "Framix": "presign",
+      "Memrix": "presign"
+    }
   }
   },
   "white_list": [
@@ -0,0 +1,162 @@
+#  _   _           _
+# | | | | __ _ ___| |__   ___ _ __
+# | |_| |/ _` / __| '_ \ / _ \ '__|
+# |  _  | (_| \__ \ | | |  __/ |
+# |_| |_|\__,_|___/_| |_|\___|_|
+#
+
+import os
+import json
+import typing
+import hashlib
+import threading
+from pathlib import Path
+from loguru import logger
+from concurrent.futures import ThreadPoolExecutor
+from utils import const
+
+
+class FileHasher(object):
+    """
+    并行文件哈希（SHA-256）。
+
+    - hashlib 在更新大块数据时释放 GIL，多文件在线程池中并发计算
+    - 每个线程复用一块 `buffer_size` 缓冲区，`readinto` 直接读入，不产生中间 bytes 对象
+    - 结果按 (绝对路径, size, mtime_ns) 缓存，未变化的文件不再重新计算；
+      指定 `cache_file` 时缓存持久化到磁盘，跨进程复用
+    """
+
+    def __init__(
+        self,
+        cache_file: typing.Optional[typing.Union[str, Path]] = None,
+        workers: int = const.HASH_WORKERS,
+        buffer_size: int = const.HASH_BUFFER
+    ):
+        self.cache_file: typing.Optional[Path] = Path(cache_file).expanduser() if cache_file else None
+        self.workers: int = workers
+        self.buffer_size: int = buffer_size
+
+        self.entries: dict[str, tuple[int, int, str]] = {}
+        self.lock: threading.Lock = threading.Lock()
+        self.local: threading.local = threading.local()
+        self.dirty: bool = False
+
+        self.hits: int = 0
+        self.misses: int = 0
+
+        if self.cache_file and self.cache_file.exists():
+            try:
+                saved = json.loads(self.cache_file.read_text(encoding=const.CHARSET))
+                self.entries = {path: tuple(entry) for path, entry in saved.items()}
+            except (OSError, ValueError) as e:
+                logger.warning(f"哈希缓存读取失败，重新计算: {e}")
+
+    def __str__(self) -> str:
+        return f"<FileHasher {len(self.entries)} entries hits={self.hits} misses={self.misses}>"
+
+    __repr__ = __str__
+
+    def digest(self, path: Path) -> str:
+        if (buffer := getattr(self.local, "buffer", None)) is None:
+            buffer = self.local.buffer = bytearray(self.buffer_size)
+        view   = memoryview(buffer)
+        sha256 = hashlib.sha256()
+
+        with path.open("rb", buffering=0) as f:
+            while n := f.readinto(view):
+                sha256.update(view[:n])
+
+        return sha256.hexdigest()
+
+    def hash_file(self, path: typing.Union[str, Path]) -> dict:
+        """
+        Returns
+        -------
+        dict
+            {"size": int, "hash": str}
+        """
+        path = Path(path).resolve()
+        stat = path.stat()
+        key  = str(path)
+
+        with self.lock:
+            if (entry := self.entries.get(key)) and entry[:2] == (stat.st_size, stat.st_mtime_ns):
+                self.hits += 1
+                return {"size": stat.st_size, "hash": entry[2]}
+
+        digest = self.digest(path)
+
+        with self.lock:
+            self.misses += 1
+            self.entries[key] = (stat.st_size, stat.st_mtime_ns, digest)
+            self.dirty = True
+
+        return {"size": stat.st_size, "hash": digest}
+
+    def hash_many(self, paths: typing.Iterable[typing.Union[str, Path]]) -> dict[str, dict]:
+        """
+        并发计算多个文件，返回 {原始路径: {"size", "hash"}}，顺序与输入一致。
+        """
+        paths = list(paths)
+        if len(paths) <= 1:
+            results = [self.hash_file(path) for path in paths]
+        else:
+            with ThreadPoolExecutor(max_workers=min(self.workers, len(paths)), thread_name_prefix="hasher") as pool:
+                results = list(pool.map(self.hash_file, paths))
+
+        self.save()
+        return {str(path): result for path, result in zip(paths, results)}
+
+    def manifest(self, folder: typing.Union[str, Path]) -> dict:
+        """
+        生成目录清单。
+
+        Returns
+        -------
+        dict
+            {
+                "files": {相对路径(posix): {"size": int, "hash": str}, ...},
+                "size": 总字节数,
+                "hash": 按相对路径排序后 "path\\0hash\\n" 拼接的 SHA-256，整棵目录树的指纹
+            }
+        """
+        folder = Path(folder)
+        if not folder.is_dir():
+            raise FileNotFoundError(f"❌ 目录不存在: {folder}")
+
+        paths = sorted(
+            Path(root, file) for root, _, files in os.walk(folder) for file in files
+        )
+        hashed = self.hash_many(paths)
+
+        files = {
+            path.relative_to(folder).as_posix(): hashed[str(path)] for path in paths
+        }
+
+        tree = hashlib.sha256()
+        for rel, info in files.items():
+            tree.update(f"{rel}\0{info['hash']}\n".encode(const.CHARSET))
+
+        return {
+            "files" : files,
+            "size"  : sum(info["size"] for info in files.values()),
+            "hash"  : tree.hexdigest()
+        }
+
+    def save(self) -> None:
+        if not self.cache_file or not self.dirty:
+            return None
+
+        with self.lock:
+            snapshot, self.dirty = dict(self.entries), False
+
+        try:
+            self.cache_file.parent.mkdir(parents=True, exist_ok=True)
+            (tmp := self.cache_file.with_suffix(".tmp")).write_text(json.dumps(snapshot), encoding=const.CHARSET)
+            tmp.replace(self.cache_file)
+        except OSError as e:
+            logger.warning(f"哈希缓存写入失败: {e}")
+
+
+if __name__ == '__main__':
+    pass
@@ -0,0 +1,157 @@
+#  _  __            ____  _
+# | |/ /___ _   _  |  _ \(_)_ __   __ _
+# | ' // _ \ | | | | |_) | | '_ \ / _` |
+# | . \  __/ |_| | |  _ <| | | | | (_| |
+# |_|\_\___|\__, | |_| \_\_|_| |_|\__, |
+#           |___/                 |___/
+#
+
+import time
+import typing
+import hashlib
+import threading
+from pathlib import Path
+from loguru import logger
+from cryptography.hazmat.primitives import serialization
+from cryptography.hazmat.primitives.asymmetric.types import PrivateKeyTypes
+from utils import (
+    const, toolset
+)
+
+
+class KeySlot(object):
+    """
+    单个私钥文件的内存槽位。
+
+    key      : 当前私钥
+    kid      : 公钥 DER 的 SHA-256 前 16 位，用作签名缓存与日志标识
+    previous : 轮换前的旧私钥，在宽限期内仍可用于解密
+    """
+
+    __slots__ = ("path", "mtime", "key", "kid", "previous", "rotated_at", "checked_at")
+
+    def __init__(self, path: Path):
+        self.path: Path = path
+        self.mtime: float = 0.0
+        self.key: typing.Optional[PrivateKeyTypes] = None
+        self.kid: str = ""
+        self.previous: typing.Optional[PrivateKeyTypes] = None
+        self.rotated_at: float = 0.0
+        self.checked_at: float = 0.0
+
+
+class KeyRing(object):
+    """
+    按应用缓存的私钥环。
+
+    - 首次使用或启动预加载时解析 PEM，之后直接复用内存中的私钥对象
+    - 每 `check_interval` 秒检查一次文件 mtime，变化即重新加载（密钥轮换）
+    - 轮换后旧私钥保留 `grace` 秒，`private_keys` 同时返回新旧两把
+    - `has` 的未命中结果同样缓存 `check_interval` 秒，未配置的算法不会每个请求都 stat 一次
+    """
+
+    def __init__(
+        self,
+        check_interval: float = const.KEY_RING_CHECK,
+        grace: float = const.KEY_RING_GRACE
+    ):
+        self.check_interval: float = check_interval
+        self.grace: float = grace
+        self.slots: dict[str, KeySlot] = {}
+        self.missing: dict[str, float] = {}
+        self.lock: threading.Lock = threading.Lock()
+
+    def __str__(self) -> str:
+        return f"<KeyRing {sorted(self.slots)}>"
+
+    __repr__ = __str__
+
+    @staticmethod
+    def fingerprint(key: PrivateKeyTypes) -> str:
+        der = key.public_key().public_bytes(
+            encoding=serialization.Encoding.DER,
+            format=serialization.PublicFormat.SubjectPublicKeyInfo
+        )
+        return hashlib.sha256(der).hexdigest()[:16]
+
+    def load(self, slot: KeySlot, now: float) -> None:
+        slot.checked_at = now
+
+        try:
+            if (mtime := slot.path.stat().st_mtime) == slot.mtime and slot.key is not None:
+                return None
+            key = serialization.load_pem_private_key(slot.path.read_bytes(), password=None)
+        except (OSError, ValueError) as e:
+            # 文件缺失或写入到一半时沿用旧密钥，下个检查周期再试
+            if slot.key is None:
+                raise
+            return logger.warning(f"私钥加载失败，沿用旧密钥 {slot.kid}: {e}")
+
+        if slot.key is not None:
+            slot.previous, slot.rotated_at = slot.key, now
+            logger.info(f"私钥轮换 -> {slot.path.name} {slot.kid} => {self.fingerprint(key)}")
+
+        slot.key, slot.kid, slot.mtime = key, self.fingerprint(key), mtime
+
+    def slot(self, key_file: str) -> KeySlot:
+        now = time.monotonic()
+
+        if (slot := self.slots.get(key_file)) is not None and now - slot.checked_at < self.check_interval:
+            return slot
+
+        with self.lock:
+            if (slot := self.slots.get(key_file)) is None:
+                slot = KeySlot(toolset.resolve_key(key_file))
+            if slot.key is None or now - slot.checked_at >= self.check_interval:
+                self.load(slot, now)
+            self.slots[key_file] = slot
+
+        return slot
+
+    def private_key(self, key_file: str) -> PrivateKeyTypes:
+        return self.slot(key_file).key
+
+    def private_keys(self, key_file: str) -> list[PrivateKeyTypes]:
+        """当前私钥在前；轮换宽限期内附带旧私钥。"""
+
+        slot = self.slot(key_file)
+        if slot.previous is not None and time.monotonic() - slot.rotated_at < self.grace:
+            return [slot.key, slot.previous]
+        return [slot.key]
+
+    def kid(self, key_file: str) -> str:
+        return self.slot(key_file).kid
+
+    def has(self, key_file: str) -> bool:
+        if key_file in self.slots:
+            return True
+
+        now = time.monotonic()
+        if now - self.missing.get(key_file, -self.check_interval) < self.check_interval:
+            return False
+
+        if toolset.resolve_key(key_file).exists():
+            self.missing.pop(key_file, None)
+            return True
+
+        self.missing[key_file] = now
+        return False
+
+    def preload(self) -> list[str]:
+        """启动时加载密钥目录下所有 `*_private_key.pem`。"""
+
+        folder = toolset.resolve_key(const.BASE_PRIVATE_KEY).parent
+        loaded = []
+        for path in sorted(folder.glob(f"*_{const.BASE_PRIVATE_KEY}")):
+            try:
+                self.slot(path.name)
+                loaded.append(path.name)
+            except Exception as e:
+                logger.warning(f"私钥预加载失败 {path.name}: {e}")
+
+        logger.info(f"私钥环已加载 -> {loaded}")
+        return loaded
+
+
+if __name__ == '__main__':
+    pass
@@ -10,7 +10,7 @@ import sys
 import json
 import time
 import typing
-import hashlib
+import functools
 from faker import Faker
 from pathlib import Path
 from loguru import logger
@@ -21,6 +21,7 @@ from cryptography.hazmat.primitives.asymmetric.types import (
     PrivateKeyTypes, PublicKeyTypes
 )
 from utils import const
+from utils.hasher import FileHasher
 
 fake: Faker = Faker()
 
@@ -90,6 +91,36 @@ def current_env(*args, **__) -> dict[str, str]:
     }
 
 
+def optional_env(*args) -> dict[str, typing.Optional[str]]:
+    """
+    获取可选的环境变量字典，缺失时为 None，不影响启动。
+
+    存在 `.env` 时先载入进程环境；每个变量依次读取 `/etc/secrets` 密钥文件与进程环境变量。
+
+    Parameters
+    ----------
+    *args : str
+        需要获取的环境变量名
+
+    Returns
+    -------
+    dict[str, str | None]
+        键为变量名，值为环境值；未配置或为空时为 None
+    """
+    if (env_path := Path(__file__).resolve().parents[1] / ".env").exists():
+        load_env_file(env_path)
+
+    env = {}
+    for arg in args:
+        try:
+            value = Path(f"/etc/secrets/{arg}").read_text().strip()
+        except OSError:
+            value = os.getenv(arg, "").strip()
+        env[arg] = value or None
+
+    return env
+
+
 def resolve_key(key_file: str) -> Path:
     """
     获取密钥文件的绝对路径。
@@ -206,6 +237,14 @@ def hide_string(
     return s[:visible] + masked + padding
 
 
+@functools.cache
+def file_hasher() -> FileHasher:
+    """
+    进程共享的文件哈希器，缓存持久化到环境变量 `const.HASH_CACHE_ENV` 指定的文件，缺省为 `const.HASH_CACHE_FILE`。
+    """
+    return FileHasher(os.getenv(const.HASH_CACHE_ENV) or const.HASH_CACHE_FILE)
+
+
 def generate_metadata(
     file_path: typing.Union[str, Path],
     file_name: str,
@@ -214,6 +253,8 @@ def generate_metadata(
     """
     构建文件元信息，用于模型发布、文件校验或下载控制等场景。
 
+    哈希由 `file_hasher()` 计算：大缓冲区 readinto，且按 (path, size, mtime) 缓存，未变化的文件不会重复计算。
+
     Parameters
     ----------
     file_path : str or Path
@@ -230,21 +271,35 @@ def generate_metadata(
     dict
         包含名称、版本、大小、哈希、下载地址和更新时间的结构化信息。
     """
-    file_path = Path(file_path)
+    hasher = file_hasher()
+    info   = hasher.hash_file(file_path)
+    hasher.save()
 
-    # 计算 SHA256 哈希
-    sha256 = hashlib.sha256()
-    with file_path.open("rb") as f:
-        for block in iter(lambda: f.read(8192), b""):
-            sha256.update(block)
+    return build_metadata(file_name, info["size"], info["hash"], version)
 
-    return {
+
+def build_metadata(
+    file_name: str,
+    size: int,
+    digest: str,
+    version: str = "1.0.0",
+    manifest: typing.Optional[dict] = None
+) -> dict:
+    """
+    由已知的大小与 SHA256 构建文件元信息，结构与 `generate_metadata` 一致（用于边上传边计算哈希的场景）。
+
+    传入 `manifest`（`ChunkManifest.finish` 返回的分块清单引用）时一并写入，随元信息签名下发。
+    """
+    metadata = {
         "filename"   : file_name,
         "version"    : version,
-        "size"       : file_path.stat().st_size,
-        "hash"       : sha256.hexdigest(),
+        "size"       : size,
+        "hash"       : digest,
         "updated_at" : time.strftime("%Y-%m-%dT%H:%M:%S", time.localtime())
     }
+    if manifest:
+        metadata["manifest"] = manifest
+    return metadata
 
 
 if __name__ == '__main__':
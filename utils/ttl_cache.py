@@ -0,0 +1,90 @@
+#  _____ _____ _        ____           _
+# |_   _|_   _| |      / ___|__ _  ___| |__   ___
+#   | |   | | | |     | |   / _` |/ __| '_ \ / _ \
+#   | |   | | | |___  | |__| (_| | (__| | | |  __/
+#   |_|   |_| |_____|  \____\__,_|\___|_| |_|\___|
+#
+
+import time
+import typing
+import collections
+
+_MISSING = object()
+
+
+class TTLCache(object):
+    """
+    有界 LRU + 逐条过期的进程内缓存。
+
+    - 超过 `maxsize` 时淘汰最久未访问的条目
+    - 每个条目可单独指定 TTL，默认使用 `ttl`
+    - 记录命中 / 未命中次数，便于观测
+    """
+
+    def __init__(self, maxsize: int, ttl: float):
+        self.maxsize: int = maxsize
+        self.ttl: float = ttl
+        self.data: collections.OrderedDict[typing.Hashable, tuple[float, typing.Any]] = collections.OrderedDict()
+
+        self.hits: int = 0
+        self.misses: int = 0
+
+    def __str__(self) -> str:
+        return f"<TTLCache {len(self.data)}/{self.maxsize} hits={self.hits} misses={self.misses}>"
+
+    __repr__ = __str__
+
+    def __len__(self) -> int:
+        return len(self.data)
+
+    def __contains__(self, key: typing.Hashable) -> bool:
+        return self.get(key, _MISSING, count=False) is not _MISSING
+
+    def get(self, key: typing.Hashable, default: typing.Any = None, *, count: bool = True) -> typing.Any:
+        if (item := self.data.get(key)) is None:
+            if count:
+                self.misses += 1
+            return default
+
+        expire_at, value = item
+        if expire_at <= time.monotonic():
+            del self.data[key]
+            if count:
+                self.misses += 1
+            return default
+
+        self.data.move_to_end(key)
+        if count:
+            self.hits += 1
+        return value
+
+    def set(self, key: typing.Hashable, value: typing.Any, ttl: typing.Optional[float] = None) -> None:
+        if (ttl := self.ttl if ttl is None else ttl) <= 0:
+            return self.pop(key)
+
+        self.data[key] = (time.monotonic() + ttl, value)
+        self.data.move_to_end(key)
+        while len(self.data) > self.maxsize:
+            self.data.popitem(last=False)
+
+    def pop(self, key: typing.Hashable, default: typing.Any = None) -> typing.Any:
+        if (item := self.data.pop(key, None)) is None:
+            return default
+        return item[1]
+
+    def clear(self) -> None:
+        self.data.clear()
+
+    def stats(self) -> dict:
+        total = self.hits + self.misses
+        return {
+            "size"     : len(self.data),
+            "maxsize"  : self.maxsize,
+            "hits"     : self.hits,
+            "misses"   : self.misses,
+            "hit_rate" : round(self.hits / total, 4) if total else 0.0
+        }
+
+
+if __name__ == '__main__':
+    pass